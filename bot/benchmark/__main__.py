@@ -0,0 +1,5 @@
+from bot.benchmark.harness import main
+
+
+if __name__ == '__main__':
+    main()
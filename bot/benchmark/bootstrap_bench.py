@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from time import time
+from types import SimpleNamespace
+
+from loguru import logger as loguru_logger
+
+from bot.core.bootstrap import bootstrap_web_data
+from bot.utils.cache import SharedCache
+from bot.utils.state import state_store
+
+
+def make_stub_fetch(latency: float, jitter: float, error_rate: float, seed: int = 0):
+    # Заглушка get_tg_web_data: задержка подключения Pyrogram и запроса RequestWebView
+    rng = random.Random(seed)
+
+    async def fetch(tg_client, proxy: str | None, session_name: str) -> str | None:
+        await asyncio.sleep(max(latency + rng.uniform(-jitter, jitter), 0))
+
+        if rng.random() < error_rate:
+            return None
+
+        return f'query_id=stub&user={session_name}&auth_date={int(time())}&hash=stub'
+
+    return fetch
+
+
+async def run_bootstrap(sessions: int, concurrency: int, fetch, cache: SharedCache) -> dict:
+    tg_clients = [SimpleNamespace(name=f'bench_{index}') for index in range(sessions)]
+
+    progress = await bootstrap_web_data(tg_clients=tg_clients, concurrency=concurrency, fetch=fetch, cache=cache)
+
+    return {
+        'elapsed': progress.elapsed,
+        'fetched': progress.fetched,
+        'cached': progress.cached,
+        'failed': progress.failed,
+        'p50': progress.durations.quantile(0.5),
+        'p99': progress.durations.quantile(0.99),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Пакетная подготовка сессий на заглушке Pyrogram')
+    parser.add_argument('-n', '--sessions', type=int, default=1000)
+    parser.add_argument('-c', '--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=1.0)
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        loguru_logger.remove()
+        loguru_logger.add(sys.stderr, level='WARNING')
+
+    directory = tempfile.TemporaryDirectory()
+    state_store.close()
+    state_store.path = os.path.join(directory.name, 'state.sqlite3')
+
+    fetch = make_stub_fetch(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    cache_path = os.path.join(directory.name, 'tg_web_data.json')
+
+    print(f"Сессий: {args.sessions} | Параллельно: {args.concurrency} | "
+          f"Задержка получения: {args.latency:g}±{args.jitter:g} сек. | "
+          f"Последовательно заняло бы ~{args.sessions * args.latency:,.0f} сек.")
+
+    # Второй запуск - перезапуск бота: данные читаются из кэша на диске
+    for name in ('cold', 'warm'):
+        report = asyncio.run(run_bootstrap(
+            sessions=args.sessions,
+            concurrency=args.concurrency,
+            fetch=fetch,
+            cache=SharedCache(path=cache_path),
+        ))
+
+        print(f"{name:<6} {report['elapsed']:>8.2f} сек. | Получено: {report['fetched']} | "
+              f"Из кэша: {report['cached']} | Ошибок: {report['failed']} | "
+              f"p50 {report['p50']:.2f} / p99 {report['p99']:.2f} сек.")
+
+    state_store.close()
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+from time import monotonic, process_time
+from types import SimpleNamespace
+
+from loguru import logger as loguru_logger
+
+from bot.benchmark.mock_server import MockConfig, MockGameServer
+from bot.config import settings
+from bot.core.scheduler import Scheduler
+from bot.core.tapper import Tapper
+from bot.utils.cache import shared_cache, web_data_cache
+from bot.utils.http_pool import http_pool
+from bot.utils.metrics import metrics
+from bot.utils.proxy_manager import proxy_manager
+from bot.utils.rate_limit import rate_limiter
+from bot.utils.state import state_store
+
+
+def get_rss() -> int:
+    # Текущий RSS в байтах; ru_maxrss - только пик, поэтому сначала /proc
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def make_tappers(sessions: int, proxies: list[str | None] | None = None) -> list[Tapper]:
+    tappers = []
+    for index in range(sessions):
+        proxy = proxies[index % len(proxies)] if proxies else None
+        tapper = Tapper(tg_client=SimpleNamespace(name=f'bench_{index}'), proxy=proxy)
+        tapper.tg_web_data = f'user=bench_{index}'
+        tappers.append(tapper)
+
+    return tappers
+
+
+async def run_benchmark(sessions: int, duration: float, workers: int, time_scale: float,
+                        config: MockConfig, proxies: dict[str, tuple[float, float]] | None = None,
+                        rate_limit_global: float = 0, rate_limit_per_proxy: float = 0) -> dict:
+    # proxies - симулированные прокси: {адрес: (дополнительная задержка, доля ошибок)}.
+    # Лимиты запросов по умолчанию выключены: бенчмарк меряет бота, а не лимитер
+    server = MockGameServer(config=config)
+    url = await server.start()
+
+    http_pool.redirect(base_url=url)
+    for proxy, (latency, error_rate) in (proxies or {}).items():
+        http_pool.redirect(base_url=await server.add_site(latency=latency, error_rate=error_rate), proxy=proxy)
+
+    limits = settings.RATE_LIMIT_GLOBAL, settings.RATE_LIMIT_PER_PROXY
+    settings.RATE_LIMIT_GLOBAL = rate_limit_global
+    settings.RATE_LIMIT_PER_PROXY = rate_limit_per_proxy
+
+    metrics.reset()
+    rate_limiter.reset()
+    proxy_manager.reset()
+
+    # Состояние и кэш симулированных аккаунтов не должны попасть в рабочие файлы
+    shared_cache.path = None
+    web_data_cache.path = None
+    state_directory = tempfile.TemporaryDirectory()
+    state_store.close()
+    state_store.path = os.path.join(state_directory.name, 'state.sqlite3')
+
+    scheduler = Scheduler(workers=workers, time_scale=time_scale)
+
+    rss_before = get_rss()
+    cpu_before = process_time()
+    started = monotonic()
+
+    tappers = make_tappers(sessions=sessions, proxies=list(proxies) if proxies else None)
+    for tapper in tappers:
+        scheduler.add(tapper)
+
+    await asyncio.sleep(duration)
+
+    elapsed = monotonic() - started
+    cpu_time = process_time() - cpu_before
+    rss_after = get_rss()
+
+    await scheduler.stop()
+    await http_pool.close()
+    await server.stop()
+
+    http_pool.redirects.pop(None, None)
+    for proxy in proxies or {}:
+        http_pool.redirects.pop(proxy, None)
+
+    state_store.close()
+    state_directory.cleanup()
+
+    settings.RATE_LIMIT_GLOBAL, settings.RATE_LIMIT_PER_PROXY = limits
+    rate_limiter.reset()
+
+    total_requests = sum(histogram.count for histogram in metrics.latency.values())
+
+    return {
+        'sessions': sessions,
+        'elapsed': elapsed,
+        'requests': total_requests,
+        'rps': total_requests / elapsed if elapsed else 0.0,
+        'cpu_time': cpu_time,
+        'retries': sum(metrics.retries.values()),
+        'coins_per_account': sum(metrics.coins.values()) / max(sessions, 1),
+        'cpu_per_request_ms': cpu_time / total_requests * 1000 if total_requests else 0.0,
+        'rss_per_account': max(rss_after - rss_before, 0) / max(sessions, 1),
+        'rss_total': rss_after,
+        'proxies': proxy_manager.snapshot(),
+        'proxy_switches': proxy_manager.switches,
+        'endpoints': {
+            path: {
+                'count': histogram.count,
+                'errors': metrics.errors.get(path, 0),
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99),
+            }
+            for path, histogram in sorted(metrics.latency.items())
+        },
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"Сессий: {report['sessions']} | Время: {report['elapsed']:.1f} сек. | "
+          f"Запросов: {report['requests']} ({report['rps']:.1f}/сек.) | Повторов: {report['retries']} | "
+          f"Монет на аккаунт: {report['coins_per_account']:,.0f}")
+    print(f"CPU: {report['cpu_time']:.2f} сек. ({report['cpu_per_request_ms']:.3f} мс/запрос) | "
+          f"RSS: {report['rss_total'] / 2 ** 20:.1f} МБ ({report['rss_per_account'] / 1024:.1f} КБ/аккаунт)")
+    print(f"{'endpoint':<36}{'count':>8}{'errors':>8}{'p50, мс':>10}{'p99, мс':>10}")
+    for path, stats in report['endpoints'].items():
+        print(f"{path:<36}{stats['count']:>8}{stats['errors']:>8}"
+              f"{stats['p50'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Нагрузочный тест бота на локальном мок-сервере')
+    parser.add_argument('-n', '--sessions', type=int, default=100)
+    parser.add_argument('-d', '--duration', type=float, default=30)
+    parser.add_argument('-w', '--workers', type=int, default=settings.SCHEDULER_WORKERS)
+    parser.add_argument('--time-scale', type=float, default=0.01)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--upgrades', type=int, default=150)
+    parser.add_argument('--rate-limit-global', type=float, default=0, help='RATE_LIMIT_GLOBAL для прогона, 0 - без лимита')
+    parser.add_argument('--rate-limit-per-proxy', type=float, default=0, help='RATE_LIMIT_PER_PROXY для прогона, 0 - без лимита')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        loguru_logger.remove()
+        loguru_logger.add(sys.stderr, level='WARNING')
+
+    config = MockConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        time_scale=args.time_scale,
+        upgrades_count=args.upgrades,
+    )
+
+    report = asyncio.run(run_benchmark(
+        sessions=args.sessions,
+        duration=args.duration,
+        workers=args.workers,
+        time_scale=args.time_scale,
+        config=config,
+        rate_limit_global=args.rate_limit_global,
+        rate_limit_per_proxy=args.rate_limit_per_proxy,
+    ))
+
+    print_report(report)
@@ -0,0 +1,113 @@
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from random import Random
+from time import monotonic
+
+from loguru import logger as loguru_logger
+from pyrogram import Client
+
+from bot.benchmark.harness import get_rss
+from bot.benchmark.mock_server import Account
+from bot.core.bootstrap import make_client
+from bot.core.tapper import Tapper
+from bot.utils.state import state_store
+
+
+def make_active_tappers(sessions: int, upgrades_count: int) -> list[Tapper]:
+    # Аккаунты в состоянии "после тапа": профиль, карты и конфиг в памяти,
+    # данные те же, что отдаёт мок-сервер. Клиент Pyrogram настоящий (без
+    # подключения), и ссылку на него держит только Tapper - как в run_tapper
+    random = Random(0)
+    tappers = []
+
+    for index in range(sessions):
+        account = Account(token=f'token_{index}', random=random, upgrades_count=upgrades_count)
+
+        tapper = Tapper(tg_client=make_client(session_name=f'bench_{index}'))
+        tapper.headers['Authorization'] = f'Bearer {account.token}'
+        tapper.access_token_created_time = 0
+        tapper.game_config = {'dailyCipher': {'cipher': 'U0FGRV', 'bonusCoins': 1_000_000, 'isClaimed': False}}
+        tapper.upgrades.update(list(account.upgrades.values()))
+        tapper.daily_combo = {'upgradeIds': [], 'bonusCoins': 5_000_000, 'isClaimed': False}
+        tapper._apply_profile(profile_data=account.clicker_user())
+
+        tappers.append(tapper)
+
+    return tappers
+
+
+def measure() -> tuple[int, int]:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0], get_rss()
+
+
+def count_clients() -> int:
+    return sum(isinstance(item, Client) for item in gc.get_objects())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Память на аккаунт в активном состоянии и в спячке')
+    parser.add_argument('-n', '--sessions', type=int, default=1000)
+    parser.add_argument('--upgrades', type=int, default=150)
+    args = parser.parse_args(argv)
+
+    loguru_logger.remove()
+    loguru_logger.add(sys.stderr, level='WARNING')
+
+    directory = tempfile.TemporaryDirectory()
+    state_store.close()
+    state_store.path = os.path.join(directory.name, 'state.sqlite3')
+
+    tracemalloc.start()
+    baseline_heap, baseline_rss = measure()
+
+    tappers = make_active_tappers(sessions=args.sessions, upgrades_count=args.upgrades)
+    active_heap, active_rss = measure()
+    active_clients = count_clients()
+
+    started = monotonic()
+    for tapper in tappers:
+        tapper._save_state()
+        tapper._hibernate()
+    hibernate_time = monotonic() - started
+    sleeping_heap, sleeping_rss = measure()
+    sleeping_clients = count_clients()
+
+    started = monotonic()
+    for tapper in tappers:
+        tapper._rehydrate()
+    rehydrate_time = monotonic() - started
+    woken_heap, _ = measure()
+
+    tracemalloc.stop()
+
+    per_account = 1024 * args.sessions
+    disk = os.path.getsize(state_store.path) + sum(
+        os.path.getsize(f'{state_store.path}{suffix}')
+        for suffix in ('-wal', '-shm')
+        if os.path.exists(f'{state_store.path}{suffix}')
+    )
+
+    print(f"Аккаунтов: {args.sessions} | Карт на аккаунт: {args.upgrades}")
+    print(f"{'состояние':<14}{'heap, КБ/акк.':>16}{'RSS, КБ/акк.':>16}{'клиентов':>12}")
+    print(f"{'активен':<14}{(active_heap - baseline_heap) / per_account:>16.1f}"
+          f"{(active_rss - baseline_rss) / per_account:>16.1f}{active_clients:>12}")
+    print(f"{'спит':<14}{(sleeping_heap - baseline_heap) / per_account:>16.1f}"
+          f"{(sleeping_rss - baseline_rss) / per_account:>16.1f}{sleeping_clients:>12}")
+    print(f"{'проснулся':<14}{(woken_heap - baseline_heap) / per_account:>16.1f}{'':>16}{'':>12}")
+    print(f"Запись на диске: {disk / per_account:.1f} КБ/акк. | "
+          f"Усыпление: {hibernate_time / args.sessions * 1000:.2f} мс/акк. | "
+          f"Пробуждение: {rehydrate_time / args.sessions * 1000:.2f} мс/акк.")
+    # RSS после освобождения может не уменьшиться: аллокатор не всегда возвращает память системе,
+    # но освобождённые страницы переиспользуются следующими аккаунтами
+
+    state_store.close()
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from random import Random
+from time import monotonic, time
+
+from aiohttp import web
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    # Ускорение игрового времени (восстановление энергии) вместе с планировщиком
+    time_scale: float = 1.0
+    upgrades_count: int = 150
+    seed: int = 0
+    # Переопределения задержки и ошибок по пути запроса, например {'/clicker/tap': 0.2}
+    endpoint_latency: dict[str, float] = field(default_factory=dict)
+    endpoint_error_rate: dict[str, float] = field(default_factory=dict)
+
+
+class Account:
+    def __init__(self, token: str, random: Random, upgrades_count: int) -> None:
+        self.token = token
+        self.balance = 2_000_000.0
+        self.total = self.balance
+        self.max_taps = 1500
+        self.available_taps = float(self.max_taps)
+        self.earn_per_tap = 1
+        self.recover_per_sec = 3
+        self.earn_on_hour = 1000
+        self.last_sync = monotonic()
+        self.exchange_id = None
+        self.streak_claimed = False
+        self.cipher_claimed = False
+        self.combo_claimed = False
+        self.combo_upgrades: list[str] = []
+        self.boost_used_at = 0.0
+
+        self.upgrades = {}
+        for index in range(upgrades_count):
+            upgrade_id = f'card_{index}'
+            price = random.randint(100, 2_000_000)
+            self.upgrades[upgrade_id] = {
+                'id': upgrade_id,
+                'name': upgrade_id,
+                'section': f'section_{index % 5}',
+                'level': random.randint(0, 10),
+                'price': price,
+                'profitPerHourDelta': max(int(price * random.uniform(0.0005, 0.004)), 1),
+                'isAvailable': random.random() < 0.9,
+                'isExpired': False,
+                'cooldownSeconds': 0,
+                'maxLevel': 25,
+                'condition': None,
+            }
+
+    def sync(self, time_scale: float) -> None:
+        now = monotonic()
+        elapsed = (now - self.last_sync) / time_scale
+        self.last_sync = now
+
+        self.available_taps = min(self.available_taps + elapsed * self.recover_per_sec, self.max_taps)
+
+        passive = self.earn_on_hour * elapsed / 3600
+        self.balance += passive
+        self.total += passive
+
+    def clicker_user(self) -> dict:
+        return {
+            'balanceCoins': self.balance,
+            'totalCoins': self.total,
+            'availableTaps': int(self.available_taps),
+            'maxTaps': self.max_taps,
+            'earnPerTap': self.earn_per_tap,
+            'tapsRecoverPerSec': self.recover_per_sec,
+            'earnPassivePerHour': self.earn_on_hour,
+            'lastPassiveEarn': 0,
+            'lastSyncUpdate': int(time()),
+            'exchangeId': self.exchange_id,
+        }
+
+
+class MockGameServer:
+    # Локальная замена игрового API: те же пути, что использует bot.api,
+    # с настраиваемой задержкой и внедрением ошибок
+    def __init__(self, config: MockConfig | None = None) -> None:
+        self.config = config or MockConfig()
+        self.random = Random(self.config.seed)
+        self.accounts: dict[str, Account] = {}
+        self.requests: dict[str, int] = {}
+        self.combo = [f'card_{index}' for index in range(3)]
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.add_routes([
+            web.get('/ip', self.ip),
+            web.get('/_nuxt/builds/{tail:.*}', self.nuxt_builds),
+            web.get('/api/GetCombo', self.combo_cards),
+            web.post('/auth/auth-by-telegram-webapp', self.login),
+            web.post('/auth/me-telegram', self.me_telegram),
+            web.post('/clicker/config', self.config_data),
+            web.post('/clicker/sync', self.sync),
+            web.post('/clicker/upgrades-for-buy', self.upgrades_for_buy),
+            web.post('/clicker/buy-upgrade', self.buy_upgrade),
+            web.post('/clicker/tap', self.tap),
+            web.post('/clicker/boosts-for-buy', self.boosts_for_buy),
+            web.post('/clicker/buy-boost', self.buy_boost),
+            web.post('/clicker/list-tasks', self.list_tasks),
+            web.post('/clicker/check-task', self.check_task),
+            web.post('/clicker/claim-daily-cipher', self.claim_daily_cipher),
+            web.post('/clicker/claim-daily-combo', self.claim_daily_combo),
+            web.post('/clicker/select-exchange', self.select_exchange),
+        ])
+
+        self._runner: web.AppRunner | None = None
+        self.url = ''
+        # Дополнительные порты с собственной задержкой и ошибками - симуляция прокси
+        self.sites: dict[int, tuple[float, float]] = {}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, host=host, port=port)
+        await site.start()
+
+        port = self._runner.addresses[0][1]
+        self.url = f'http://{host}:{port}'
+
+        return self.url
+
+    async def add_site(self, latency: float = 0.0, error_rate: float = 0.0, host: str = '127.0.0.1') -> str:
+        # Тот же сервер на новом порту: запросы через него получают дополнительную
+        # задержку latency и долю ошибок error_rate, как через медленный прокси
+        site = web.TCPSite(self._runner, host=host, port=0)
+        await site.start()
+
+        port = self._runner.addresses[-1][1]
+        self.sites[port] = (latency, error_rate)
+
+        return f'http://{host}:{port}'
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        path = request.path
+        self.requests[path] = self.requests.get(path, 0) + 1
+
+        sockname = request.transport.get_extra_info('sockname') if request.transport else None
+        site_latency, site_error_rate = self.sites.get(sockname[1] if sockname else None, (0.0, 0.0))
+
+        latency = self.config.endpoint_latency.get(path, self.config.latency) + site_latency
+        if self.config.jitter:
+            latency += self.random.uniform(0, self.config.jitter)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+        error_rate = self.config.endpoint_error_rate.get(path, self.config.error_rate)
+        error_rate = 1 - (1 - error_rate) * (1 - site_error_rate)
+        if error_rate and self.random.random() < error_rate:
+            return web.json_response({'error_code': 'Internal', 'error_message': 'Injected error'}, status=500)
+
+        return await handler(request)
+
+    def _account(self, request: web.Request) -> Account:
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        account = self.accounts.get(token)
+        if account is None:
+            raise web.HTTPUnauthorized(
+                text=json.dumps({'error_code': 'NotFound_Session'}),
+                content_type='application/json',
+            )
+
+        account.sync(time_scale=self.config.time_scale)
+
+        return account
+
+    async def ip(self, request: web.Request) -> web.Response:
+        return web.json_response({'origin': request.remote})
+
+    async def nuxt_builds(self, request: web.Request) -> web.Response:
+        return web.json_response({'id': 'mock', 'timestamp': int(time() * 1000)})
+
+    async def combo_cards(self, request: web.Request) -> web.Response:
+        date = datetime.now()
+        if date.hour < 15:
+            date -= timedelta(days=1)
+
+        return web.json_response({'combo': self.combo, 'date': date.strftime('%d-%m-%y')})
+
+    async def login(self, request: web.Request) -> web.Response:
+        data = await request.json()
+
+        token = f"mock-{data.get('initDataRaw', '')}"
+        if token not in self.accounts:
+            self.accounts[token] = Account(
+                token=token,
+                random=Random(f'{self.config.seed}:{token}'),
+                upgrades_count=self.config.upgrades_count,
+            )
+
+        return web.json_response({'authToken': token})
+
+    async def me_telegram(self, request: web.Request) -> web.Response:
+        self._account(request)
+        return web.json_response({'telegramUser': {'id': 1}})
+
+    async def config_data(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        return web.json_response({
+            'dailyCipher': {
+                'cipher': 'U0FGRV',
+                'bonusCoins': 1_000_000,
+                'isClaimed': account.cipher_claimed,
+            },
+        })
+
+    async def sync(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        return web.json_response({'clickerUser': account.clicker_user()})
+
+    async def upgrades_for_buy(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        return web.json_response({
+            'upgradesForBuy': list(account.upgrades.values()),
+            'dailyCombo': {
+                'upgradeIds': account.combo_upgrades,
+                'bonusCoins': 5_000_000,
+                'isClaimed': account.combo_claimed,
+            },
+        })
+
+    async def buy_upgrade(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        data = await request.json()
+
+        upgrade = account.upgrades.get(data.get('upgradeId'))
+        if upgrade is None or upgrade['price'] > account.balance:
+            return web.json_response({'error_code': 'INSUFFICIENT_FUNDS'}, status=400)
+
+        account.balance -= upgrade['price']
+        account.earn_on_hour += upgrade['profitPerHourDelta']
+        if upgrade['id'] in self.combo and upgrade['id'] not in account.combo_upgrades:
+            account.combo_upgrades.append(upgrade['id'])
+
+        upgrade['level'] += 1
+        upgrade['price'] = int(upgrade['price'] * 1.05)
+        upgrade['profitPerHourDelta'] = max(int(upgrade['profitPerHourDelta'] * 1.03), 1)
+
+        return web.json_response({
+            'clickerUser': account.clicker_user(),
+            'upgradesForBuy': list(account.upgrades.values()),
+        })
+
+    async def tap(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        data = await request.json()
+
+        count = min(int(data.get('count', 0)), int(account.available_taps) // account.earn_per_tap)
+        coins = count * account.earn_per_tap
+
+        account.available_taps -= coins
+        account.balance += coins
+        account.total += coins
+
+        return web.json_response({'clickerUser': account.clicker_user()})
+
+    async def boosts_for_buy(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        cooldown = max(int(3600 - (monotonic() - account.boost_used_at) / self.config.time_scale), 0)
+        if not account.boost_used_at:
+            cooldown = 0
+
+        return web.json_response({'boostsForBuy': [{
+            'id': 'BoostFullAvailableTaps',
+            'level': 1,
+            'maxLevel': 6,
+            'cooldownSeconds': cooldown,
+        }]})
+
+    async def buy_boost(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        account.available_taps = account.max_taps
+        account.boost_used_at = monotonic()
+
+        return web.json_response({'clickerUser': account.clicker_user()})
+
+    async def list_tasks(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        return web.json_response({'tasks': [{
+            'id': 'streak_days',
+            'isCompleted': account.streak_claimed,
+            'days': 1,
+            'rewardsByDays': [{'days': 1, 'rewardCoins': 500}],
+        }]})
+
+    async def check_task(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        account.streak_claimed = True
+        return web.json_response({'task': {'id': 'streak_days', 'isCompleted': True}})
+
+    async def claim_daily_cipher(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        account.cipher_claimed = True
+        return web.json_response({'clickerUser': account.clicker_user()})
+
+    async def claim_daily_combo(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        account.combo_claimed = True
+        return web.json_response({'clickerUser': account.clicker_user()})
+
+    async def select_exchange(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        data = await request.json()
+        account.exchange_id = data.get('exchangeId')
+        return web.json_response({'clickerUser': account.clicker_user()})
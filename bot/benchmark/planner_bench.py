@@ -0,0 +1,183 @@
+import argparse
+import random
+from time import process_time
+
+from bot.config import settings
+from bot.core.planner import np, plan_upgrades
+from bot.core.upgrades import UpgradeIndex, is_upgrade_profitable, level_curves
+
+
+class SimulatedAccount:
+    # Аккаунт без сети: у каждой карты свой истинный рост цены и прибыли,
+    # который бот узнаёт только после покупки (как и в настоящей игре)
+    def __init__(self, cards: int, seed: int) -> None:
+        rng = random.Random(seed)
+
+        self.balance = rng.randint(2_000_000, 20_000_000)
+        self.earn_on_hour = rng.randint(50_000, 500_000)
+        self.tap_income = rng.randint(5_000, 50_000)
+        self.spent = 0
+        self.growth = {}
+        self.cards = {}
+
+        for index in range(cards):
+            upgrade_id = f'card_{index}'
+            price = rng.randint(1_000, 3_000_000)
+            price_growth = rng.uniform(1.03, 1.3)
+
+            self.growth[upgrade_id] = (price_growth, price_growth * rng.uniform(0.8, 1.02))
+            self.cards[upgrade_id] = {
+                'id': upgrade_id,
+                'level': rng.randint(1, 10),
+                'price': price,
+                'profitPerHourDelta': max(int(price * rng.uniform(0.002, 0.05)), 1),
+                'maxLevel': 25,
+                'isAvailable': True,
+                'isExpired': False,
+                'cooldownSeconds': 0,
+            }
+
+    def upgrades_for_buy(self) -> list[dict]:
+        return list(self.cards.values())
+
+    def buy(self, upgrade_id: str) -> bool:
+        card = self.cards[upgrade_id]
+        if card['price'] > self.balance or not is_upgrade_profitable(card):
+            return False
+
+        price_growth, profit_growth = self.growth[upgrade_id]
+
+        self.balance -= card['price']
+        self.spent += card['price']
+        self.earn_on_hour += card['profitPerHourDelta']
+        self.cards[upgrade_id] = {
+            **card,
+            'level': card['level'] + 1,
+            'price': int(card['price'] * price_growth),
+            'profitPerHourDelta': int(card['profitPerHourDelta'] * profit_growth),
+        }
+
+        return True
+
+    def earn(self, hours: float) -> None:
+        self.balance += int((self.earn_on_hour + self.tap_income) * hours)
+
+
+def select_greedy(upgrades: UpgradeIndex, account: SimulatedAccount, count: int) -> int:
+    bought = 0
+    for _ in range(count):
+        max_price = upgrades.max_price(balance=account.balance, earn_on_hour=account.earn_on_hour)
+        upgrade = upgrades.best(max_price=max_price)
+        if upgrade is None or not account.buy(upgrade_id=upgrade['id']):
+            break
+
+        upgrades.update(account.upgrades_for_buy())
+        bought += 1
+
+    return bought
+
+
+def select_planned(upgrades: UpgradeIndex, account: SimulatedAccount, count: int) -> int:
+    # Повторяет Tapper._next_planned_upgrade: шаги плана перепроверяются по текущим ценам
+    plan = plan_upgrades(upgrades=upgrades, balance=account.balance,
+                         earn_on_hour=account.earn_on_hour, count=count)
+
+    bought = 0
+    for planned in plan:
+        max_price = upgrades.max_price(balance=account.balance, earn_on_hour=account.earn_on_hour)
+        upgrade = upgrades.get(planned['id'])
+        if upgrade is None or upgrade['level'] != planned['level'] or upgrade['price'] > max_price:
+            continue
+        if not account.buy(upgrade_id=upgrade['id']):
+            continue
+
+        upgrades.update(account.upgrades_for_buy())
+        bought += 1
+
+    return bought
+
+
+def simulate(strategy, accounts: int, cards: int, hours: float, round_hours: float, count: int,
+             value_hours: float) -> dict:
+    # Баланс в конце не учитывает купленный доход: стоимость аккаунта - баланс
+    # плюс прирост дохода в час за value_hours часов после симуляции
+    level_curves.reset()
+
+    cpu_time = 0.0
+    decisions = 0
+    bought = 0
+    start_value = 0
+    end_value = 0
+    earn_on_hour = 0
+    income_gained = 0
+    spent = 0
+
+    for seed in range(accounts):
+        account = SimulatedAccount(cards=cards, seed=seed)
+        upgrades = UpgradeIndex(account.upgrades_for_buy())
+        start_value += account.balance
+        start_earn_on_hour = account.earn_on_hour
+
+        elapsed = 0.0
+        while elapsed < hours:
+            started = process_time()
+            bought += strategy(upgrades=upgrades, account=account, count=count)
+            cpu_time += process_time() - started
+            decisions += 1
+
+            account.earn(hours=round_hours)
+            elapsed += round_hours
+
+        end_value += account.balance + (account.earn_on_hour - start_earn_on_hour) * value_hours
+        earn_on_hour += account.earn_on_hour
+        income_gained += account.earn_on_hour - start_earn_on_hour
+        spent += account.spent
+
+    return {
+        'value': (end_value - start_value) / accounts,
+        'roi': end_value / start_value - 1 if start_value else 0.0,
+        'earn_on_hour': earn_on_hour / accounts,
+        'payback': spent / income_gained if income_gained else 0.0,
+        'bought': bought / accounts,
+        'cpu_ms': cpu_time / decisions * 1000 if decisions else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Сравнение планировщика улучшений с жадным выбором карт')
+    parser.add_argument('-n', '--accounts', type=int, default=20)
+    parser.add_argument('-c', '--cards', type=int, default=150)
+    parser.add_argument('--hours', type=float, default=24, help='длительность симуляции')
+    parser.add_argument('--horizon', type=float, default=settings.PLANNER_HORIZON_HOURS,
+                        help='PLANNER_HORIZON_HOURS для прогона, по умолчанию из настроек')
+    parser.add_argument('--value-hours', type=float, default=None,
+                        help='за сколько часов после симуляции учитывать купленный доход, по умолчанию --hours')
+    parser.add_argument('--round-hours', type=float, default=1)
+    parser.add_argument('--count', type=int, default=settings.UPGRADES_COUNT)
+    parser.add_argument('--balance-to-save', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if np is None:
+        parser.error('для планировщика нужен numpy')
+
+    value_hours = args.hours if args.value_hours is None else args.value_hours
+
+    settings.BALANCE_TO_SAVE = args.balance_to_save
+    settings.PLANNER_HORIZON_HOURS = args.horizon
+
+    print(f"Аккаунтов: {args.accounts} | Карт: {args.cards} | Период: {args.hours:g} ч. | "
+          f"Горизонт планировщика: {args.horizon:g} ч. | Глубина планировщика: {settings.PLANNER_DEPTH} ур. | "
+          f"Доход учитывается за {value_hours:g} ч.")
+    print(f"{'стратегия':<12}{'прирост стоимости':>20}{'ROI':>10}{'доход/ч':>14}{'окупаемость, ч':>16}"
+          f"{'покупок':>10}{'CPU, мс/решение':>18}")
+
+    for name, strategy in (('greedy', select_greedy), ('planner', select_planned)):
+        result = simulate(strategy=strategy, accounts=args.accounts, cards=args.cards, hours=args.hours,
+                          round_hours=args.round_hours, count=args.count, value_hours=value_hours)
+
+        print(f"{name:<12}{result['value']:>20,.0f}{result['roi']:>10.2%}{result['earn_on_hour']:>14,.0f}"
+              f"{result['payback']:>16.1f}{result['bought']:>10.1f}{result['cpu_ms']:>18.3f}")
+
+
+if __name__ == '__main__':
+    main()
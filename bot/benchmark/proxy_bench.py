@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import sys
+
+from loguru import logger as loguru_logger
+
+from bot.benchmark.harness import run_benchmark
+from bot.benchmark.mock_server import MockConfig
+from bot.config import settings
+
+
+def make_proxies(fast: int, slow: int, slow_latency: float, slow_error_rate: float) -> dict[str, tuple[float, float]]:
+    proxies = {f'http://fast-{index}.proxy:8080': (0.0, 0.0) for index in range(fast)}
+    proxies.update({f'http://slow-{index}.proxy:8080': (slow_latency, slow_error_rate) for index in range(slow)})
+
+    return proxies
+
+
+def print_report(name: str, report: dict) -> None:
+    slow_accounts = sum(stats['accounts'] for proxy, stats in report['proxies'].items() if '//slow-' in proxy)
+    p99 = max((stats['p99'] for stats in report['endpoints'].values()), default=0.0)
+
+    print(f"{name:<10}{report['rps']:>10.1f}{report['coins_per_account']:>16,.0f}"
+          f"{report['retries']:>10}{p99 * 1000:>12.0f}{slow_accounts:>14}{report['proxy_switches']:>12}")
+
+
+def print_proxies(report: dict) -> None:
+    print(f"{'proxy':<28}{'accounts':>10}{'latency, мс':>14}{'errors':>9}{'samples':>9}")
+    for proxy, stats in sorted(report['proxies'].items()):
+        print(f"{proxy:<28}{stats['accounts']:>10}{stats['latency'] * 1000:>14.0f}"
+              f"{stats['error_rate']:>9.0%}{stats['samples']:>9}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description='Переназначение прокси на мок-сервере с медленными прокси')
+    parser.add_argument('-n', '--sessions', type=int, default=200)
+    parser.add_argument('-d', '--duration', type=float, default=60)
+    parser.add_argument('-w', '--workers', type=int, default=settings.SCHEDULER_WORKERS)
+    parser.add_argument('--time-scale', type=float, default=0.01)
+    parser.add_argument('--fast', type=int, default=6)
+    parser.add_argument('--slow', type=int, default=2)
+    parser.add_argument('--slow-latency', type=float, default=1.0)
+    parser.add_argument('--slow-error-rate', type=float, default=0.1)
+    parser.add_argument('--sticky', type=float, default=5, help='PROXY_STICKY_SECONDS для прогона')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        loguru_logger.remove()
+        loguru_logger.add(sys.stderr, level='WARNING')
+
+    proxies = make_proxies(fast=args.fast, slow=args.slow,
+                           slow_latency=args.slow_latency, slow_error_rate=args.slow_error_rate)
+    settings.PROXY_STICKY_SECONDS = args.sticky
+
+    print(f"Сессий: {args.sessions} | Прокси: {args.fast} быстрых, {args.slow} медленных "
+          f"(+{args.slow_latency:g} сек., {args.slow_error_rate:.0%} ошибок) | Время: {args.duration:g} сек.")
+    print(f"{'режим':<10}{'rps':>10}{'монет/аккаунт':>16}{'повторов':>10}{'p99, мс':>12}{'на медленных':>14}{'переводов':>12}")
+
+    reports = {}
+    for name, reassign in (('pinned', False), ('managed', True)):
+        settings.PROXY_REASSIGN = reassign
+
+        reports[name] = asyncio.run(run_benchmark(
+            sessions=args.sessions,
+            duration=args.duration,
+            workers=args.workers,
+            time_scale=args.time_scale,
+            config=MockConfig(time_scale=args.time_scale),
+            proxies=proxies,
+        ))
+
+        print_report(name=name, report=reports[name])
+
+    print()
+    print_proxies(report=reports['managed'])
+
+
+if __name__ == '__main__':
+    main()
@@ -17,16 +17,72 @@ class Settings(BaseSettings):
     BALANCE_TO_SAVE: int = 1000000
     UPGRADES_COUNT: int = 10
     MAX_UPGRADE_PRICE: int = 10000000   
+    UPGRADE_PLANNER: bool = True
+    PLANNER_HORIZON_HOURS: float = 0
+    PLANNER_DEPTH: int = 5
 
     APPLY_DAILY_ENERGY: bool = True
     APPLY_DAILY_TURBO: bool = True
+    DAILY_JOBS_CONCURRENCY: int = 2
 
+    USE_ENERGY_MODEL: bool = True
     RANDOM_TAPS_COUNT: list[int] = [10, 50]
     SLEEP_BETWEEN_TAP: list[int] = [10, 25]
 
     USE_RANDOM_USERAGENT: bool = False
 
     USE_PROXY_FROM_FILE: bool = False
+    PROXY_REASSIGN: bool = False
+    PROXY_STICKY_SECONDS: int = 600
+    PROXY_MIN_SAMPLES: int = 20
+    PROXY_MAX_ERROR_RATE: float = 0.2
+    PROXY_SWITCH_FACTOR: float = 2.0
+    PROXY_MAX_ACCOUNTS: int = 0
+
+    POOL_LIMIT: int = 100
+    POOL_LIMIT_PER_HOST: int = 30
+    POOL_KEEPALIVE_TIMEOUT: int = 60
+    POOL_DNS_CACHE_TTL: int = 300
+
+    SCHEDULER_WORKERS: int = 50
+
+    WORKERS: int = 0
+    SHARD_BY: str = 'session'
+
+    RATE_LIMIT_GLOBAL: float = 100
+    RATE_LIMIT_PER_PROXY: float = 20
+    BACKOFF_BASE: float = 3
+    BACKOFF_MAX: float = 600
+    BREAKER_THRESHOLD: int = 10
+    BREAKER_COOLDOWN: int = 60
+
+    METRICS_HOST: str = '127.0.0.1'
+    METRICS_PORT: int = 0
+    METRICS_JSON_PATH: str = ''
+    METRICS_DUMP_INTERVAL: int = 60
+
+    PROFILE_LOG_INTERVAL: int = 300
+    SLOW_CALLBACK_MS: int = 0
+    PROFILER_PORT: int = 0
+    PROFILER_INTERVAL_MS: int = 5
+    PROFILER_PATH: str = 'data/profiles'
+
+    TOKEN_TTL: int = 3600
+    HIBERNATE: bool = True
+    HIBERNATE_AFTER: int = 300
+    STATE_PATH: str = 'data/state.sqlite3'
+
+    SHARED_CACHE_TTL: int = 1800
+    SHARED_CACHE_PATH: str = 'data/shared_cache.json'
+    SHARED_CACHE_SAVE_DELAY: int = 5
+
+    BOOTSTRAP_CONCURRENCY: int = 20
+    TG_WEB_DATA_TTL: int = 3600
+    WEB_DATA_CACHE_PATH: str = 'data/tg_web_data.json'
+
+    LOG_MODE: str = 'text'
+    LOG_LEVEL: str = 'INFO'
+    LOG_TAPS_EVERY: int = 1
 
 
 settings = Settings()
@@ -0,0 +1,138 @@
+import asyncio
+from time import monotonic, time
+from typing import Awaitable, Callable
+
+from pyrogram import Client
+
+from bot.config import settings
+from bot.utils.cache import SharedCache, web_data_cache, web_data_ttl
+from bot.utils.logger import logger
+from bot.utils.metrics import Histogram, metrics
+from bot.utils.state import state_store
+from bot.utils.tg_web_data import get_tg_web_data
+
+
+PROGRESS_INTERVAL = 2
+
+
+def make_client(session_name: str) -> Client:
+    return Client(
+        name=session_name,
+        api_id=settings.API_ID,
+        api_hash=settings.API_HASH,
+        workdir='sessions/',
+    )
+
+
+class BootstrapProgress:
+    # Ход получения данных веб-приложения при запуске: сколько сессий готово,
+    # сколько взято из кэша или пропущено и сколько заняло получение
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.fetched = 0
+        self.cached = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = monotonic()
+        self.durations = Histogram()
+
+    @property
+    def done(self) -> int:
+        return self.fetched + self.cached + self.skipped + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return monotonic() - self.started
+
+    def log(self) -> None:
+        logger.info(f"Подготовка сессий: <y>{self.done}/{self.total}</y> | "
+                    f"Получено: <g>{self.fetched}</g> | Из кэша: <g>{self.cached}</g> | "
+                    f"Токен действителен: <g>{self.skipped}</g> | Ошибок: <r>{self.failed}</r> | "
+                    f"{self.elapsed:.1f} сек.")
+
+    def log_summary(self) -> None:
+        self.log()
+
+        if self.durations.count:
+            logger.info(f"Получение данных веб-приложения: p50 <y>{self.durations.quantile(0.5):.2f}</y> сек. | "
+                        f"p99 <y>{self.durations.quantile(0.99):.2f}</y> сек.")
+
+
+def has_valid_token(session_name: str) -> bool:
+    # Сохранённый токен ещё действует - данные веб-приложения до его истечения не нужны
+    state = state_store.load(session_name=session_name)
+
+    return bool(
+        state
+        and state['access_token']
+        and time() - (state['token_created_at'] or 0) < settings.TOKEN_TTL
+    )
+
+
+async def bootstrap_web_data(
+        tg_clients: list[Client],
+        proxies: dict[str, str | None] | None = None,
+        concurrency: int | None = None,
+        fetch: Callable[..., Awaitable[str | None]] = get_tg_web_data,
+        cache: SharedCache = web_data_cache,
+) -> BootstrapProgress:
+    # Получает данные веб-приложения для всех сессий ограниченным пулом и сохраняет
+    # их на диск вместе со сроком действия, чтобы аккаунты сразу переходили ко входу.
+    # fetch подменяется в тестах и бенчмарке, от клиента нужно только поле name
+    proxies = proxies or {}
+    concurrency = settings.BOOTSTRAP_CONCURRENCY if concurrency is None else concurrency
+
+    progress = BootstrapProgress(total=len(tg_clients))
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def acquire(tg_client: Client) -> None:
+        session_name = tg_client.name
+
+        if cache.get(session_name) is not None:
+            progress.cached += 1
+            return
+
+        if has_valid_token(session_name=session_name):
+            progress.skipped += 1
+            return
+
+        async with semaphore:
+            started = monotonic()
+            try:
+                tg_web_data = await fetch(
+                    tg_client=tg_client,
+                    proxy=proxies.get(session_name),
+                    session_name=session_name,
+                )
+            except Exception as error:
+                logger.error(f"{session_name} | Не удалось получить данные веб-приложения: {error}")
+                tg_web_data = None
+
+            duration = monotonic() - started
+
+        progress.durations.observe(duration)
+        metrics.observe_request(endpoint='tg_web_data', duration=duration, error=not tg_web_data)
+
+        if not tg_web_data:
+            progress.failed += 1
+            return
+
+        cache.set(key=session_name, value=tg_web_data, ttl=web_data_ttl(tg_web_data), save=False)
+        progress.fetched += 1
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            progress.log()
+
+    reporter = asyncio.create_task(report())
+
+    try:
+        await asyncio.gather(*(acquire(tg_client) for tg_client in tg_clients))
+    finally:
+        reporter.cancel()
+        cache.flush()
+
+    progress.log_summary()
+
+    return progress
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+from time import time
+from typing import Awaitable, Callable
+
+from bot.utils.logger import logger
+
+
+# Ежедневные награды и комбо обновляются в 15:00 (как и окно комбо из поля date)
+DAILY_RESET_HOUR = 15
+
+
+def next_daily_reset(now: float | None = None) -> float:
+    now = datetime.fromtimestamp(time() if now is None else now)
+    reset = now.replace(hour=DAILY_RESET_HOUR, minute=0, second=0, microsecond=0)
+    if reset <= now:
+        reset += timedelta(days=1)
+
+    return reset.timestamp()
+
+
+class DailyJob:
+    # Описание ежедневного задания: run возвращает время, до которого награда
+    # считается собранной, или None, если собрать её пока не удалось
+    __slots__ = ('name', 'run')
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[float | None]]) -> None:
+        self.name = name
+        self.run = run
+
+
+class DailyClaims:
+    # Собранные награды аккаунта с временем сброса; переживают перезапуск через StateStore
+    def __init__(self, claims: dict[str, float] | None = None) -> None:
+        self._claims: dict[str, float] = dict(claims or {})
+
+    def is_claimed(self, name: str, now: float | None = None) -> bool:
+        return self._claims.get(name, 0) > (time() if now is None else now)
+
+    def claim(self, name: str, until: float) -> None:
+        self._claims[name] = until
+
+    def to_dict(self) -> dict[str, float]:
+        now = time()
+        return {name: until for name, until in self._claims.items() if until > now}
+
+
+async def run_daily_jobs(jobs: list[DailyJob], claims: DailyClaims,
+                         concurrency: int, session_name: str) -> None:
+    # Независимые задания выполняются одновременно, но не больше concurrency
+    # запросов на аккаунт. Уже собранные до сброса задания пропускаются без запросов
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    pending = [job for job in jobs if not claims.is_claimed(job.name)]
+
+    async def run(job: DailyJob) -> None:
+        try:
+            async with semaphore:
+                until = await job.run()
+
+        except Exception as error:
+            logger.error(f"{session_name} | Ошибка ежедневного задания {job.name}: {error}")
+
+        else:
+            if until is not None:
+                claims.claim(name=job.name, until=until)
+
+    await asyncio.gather(*(run(job) for job in pending))
@@ -0,0 +1,50 @@
+from time import time
+
+
+class EnergyModel:
+    # Восстановление энергии по полям профиля: сколько тапов можно отправить
+    # прямо сейчас и через сколько секунд энергия будет полной
+    __slots__ = ('available', 'max_taps', 'recover_per_sec', 'earn_per_tap', 'updated_at')
+
+    def __init__(self) -> None:
+        self.available = 0.0
+        self.max_taps = 0
+        self.recover_per_sec = 0.0
+        self.earn_per_tap = 1
+        self.updated_at = 0.0
+
+    def update(self, profile_data: dict, now: float | None = None) -> None:
+        self.available = float(profile_data.get('availableTaps', 0))
+        self.max_taps = profile_data.get('maxTaps', self.max_taps) or self.max_taps
+        self.recover_per_sec = profile_data.get('tapsRecoverPerSec', self.recover_per_sec) or self.recover_per_sec
+        self.earn_per_tap = max(profile_data.get('earnPerTap', self.earn_per_tap) or 1, 1)
+
+        if now is None:
+            # Сохранённый профиль мог устареть - берём время синхронизации с сервера
+            now = profile_data.get('lastSyncUpdate') or time()
+
+        self.updated_at = now
+
+    def refill(self, now: float | None = None) -> None:
+        # Буст энергии: сервер возвращает только статус, полная шкала - с момента применения
+        self.available = float(self.max_taps)
+        self.updated_at = time() if now is None else now
+
+    @property
+    def is_known(self) -> bool:
+        return self.max_taps > 0 and self.recover_per_sec > 0
+
+    def energy_at(self, now: float | None = None) -> float:
+        now = time() if now is None else now
+        energy = self.available + max(now - self.updated_at, 0) * self.recover_per_sec
+
+        return min(energy, self.max_taps) if self.max_taps else energy
+
+    def taps_available(self, now: float | None = None) -> int:
+        return int(self.energy_at(now=now)) // self.earn_per_tap
+
+    def time_until_full(self, now: float | None = None) -> float:
+        if not self.is_known:
+            return 0
+
+        return max(self.max_taps - self.energy_at(now=now), 0) / self.recover_per_sec
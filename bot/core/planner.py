@@ -0,0 +1,123 @@
+from bot.config import settings
+from bot.core.upgrades import UpgradeIndex, is_upgrade_profitable, level_curves
+from bot.utils.logger import logger
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_warned = False
+
+
+def is_planner_available() -> bool:
+    global _warned
+
+    if not settings.UPGRADE_PLANNER:
+        return False
+
+    if np is None:
+        if not _warned:
+            logger.warning("Планировщик улучшений требует numpy, используется жадный выбор карт")
+            _warned = True
+        return False
+
+    return True
+
+
+def plan_upgrades(upgrades: UpgradeIndex, balance: float, earn_on_hour: float, count: int,
+                  horizon: float | None = None, depth: int | None = None) -> list[dict]:
+    # Симуляция покупок на несколько уровней вперёд для всех карт сразу (карты x уровни).
+    # Оценка уровня k - лучшая средняя окупаемость цепочки k..j этой же карты, поэтому
+    # дешёвый, но слабый уровень, открывающий выгодные следующие, тоже попадает в план.
+    # Возвращает упорядоченный список покупок {'id', 'level', 'price', 'profit'}
+    horizon = settings.PLANNER_HORIZON_HOURS if horizon is None else horizon
+    depth = settings.PLANNER_DEPTH if depth is None else depth
+
+    cards = [upgrade for upgrade in upgrades if is_upgrade_profitable(upgrade)]
+    if not cards or count <= 0:
+        return []
+
+    growth = np.array([level_curves.growth(upgrade.id) for upgrade in cards], dtype=np.float64)
+    base_price = np.array([upgrade.price for upgrade in cards], dtype=np.float64)
+    base_profit = np.array([upgrade.profit for upgrade in cards], dtype=np.float64)
+    level = np.array([upgrade.level for upgrade in cards], dtype=np.int64)
+    max_level = np.array([min(upgrade.get('maxLevel', settings.MAX_LEVEL), settings.MAX_LEVEL) for upgrade in cards])
+
+    steps = np.arange(depth)
+    prices = np.floor(base_price[:, None] * growth[:, 0:1] ** steps)
+    profits = np.floor(base_profit[:, None] * growth[:, 1:2] ** steps)
+
+    valid = (
+        (level[:, None] + steps <= max_level[:, None])
+        & (prices < settings.MAX_UPGRADE_PRICE)
+        & (profits > 0)
+    )
+    valid = np.logical_and.accumulate(valid, axis=1)
+
+    # Отрезки цепочки k..j: суммарная прибыль / суммарная цена
+    cum_prices = np.cumsum(np.where(valid, prices, 0), axis=1)
+    cum_profits = np.cumsum(np.where(valid, profits, 0), axis=1)
+    before_prices = np.concatenate([np.zeros((len(cards), 1)), cum_prices[:, :-1]], axis=1)
+    before_profits = np.concatenate([np.zeros((len(cards), 1)), cum_profits[:, :-1]], axis=1)
+
+    segment_prices = cum_prices[:, None, :] - before_prices[:, :, None]
+    segment_profits = cum_profits[:, None, :] - before_profits[:, :, None]
+    segment_valid = valid[:, None, :] & (steps[None, :, None] <= steps[None, None, :])
+
+    ratios = np.where(segment_valid, segment_profits / np.maximum(segment_prices, 1), -np.inf)
+    scores = ratios.max(axis=2)
+    # Уровни одной карты покупаются по порядку: оценка не растёт с уровнем
+    scores = np.minimum.accumulate(scores, axis=1)
+
+    candidates = valid
+    if horizon > 0:
+        # Уровни, которые не окупятся за горизонт, не покупаем
+        candidates = candidates & (scores * horizon >= 1)
+
+    card_indexes, steps_indexes = np.nonzero(candidates)
+    if not len(card_indexes):
+        return []
+
+    order = np.lexsort((steps_indexes, -scores[card_indexes, steps_indexes]))
+    card_indexes = card_indexes[order]
+    steps_indexes = steps_indexes[order]
+    candidate_prices = prices[card_indexes, steps_indexes]
+    candidate_profits = profits[card_indexes, steps_indexes]
+
+    plan = []
+    next_step = np.zeros(len(cards), dtype=np.int64)
+    free_money = balance - settings.BALANCE_TO_SAVE
+
+    while len(plan) < count:
+        # Лучший по оценке уровень, который уже можно купить: предыдущие уровни карты
+        # куплены, а цена проходит те же ограничения, что и в UpgradeIndex.max_price.
+        # Отложенные уровни пересматриваются после каждой покупки - лимит растёт вместе с доходом
+        affordable = (
+            (next_step[card_indexes] == steps_indexes)
+            & (candidate_prices <= free_money * 0.7)
+            & (candidate_prices < earn_on_hour * 5)
+        )
+
+        position = int(np.argmax(affordable))
+        if not affordable[position]:
+            break
+
+        card = int(card_indexes[position])
+        step = int(steps_indexes[position])
+        price = candidate_prices[position]
+        profit = candidate_profits[position]
+
+        plan.append({
+            'id': cards[card].id,
+            'level': int(level[card]) + step,
+            'price': int(price),
+            'profit': int(profit),
+        })
+
+        next_step[card] += 1
+        free_money -= price
+        earn_on_hour += profit
+
+    return plan
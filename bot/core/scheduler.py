@@ -0,0 +1,131 @@
+import asyncio
+import heapq
+from itertools import count
+
+from bot.config import settings
+
+
+class Scheduler:
+    # Один таймер на весь процесс: куча "следующее действие аккаунта в момент T"
+    # и ограниченный пул воркеров. Задача - любой объект с корутиной step(),
+    # которая возвращает задержку до следующего шага или None для завершения.
+    def __init__(self, workers: int, time_scale: float = 1.0) -> None:
+        self.workers = workers
+        self.time_scale = time_scale
+
+        self._heap: list[tuple[float, int, object]] = []
+        self._counter = count()
+        self._futures: dict[object, asyncio.Future] = {}
+        self._ready: asyncio.Queue | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[asyncio.Task, object] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def running(self, task: asyncio.Task) -> object | None:
+        # Задача, шаг которой последним выполнял воркер task (для профайлера)
+        return self._running.get(task)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+
+        loop = asyncio.get_running_loop()
+
+        self._ready = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+
+        self._tasks.append(loop.create_task(self._dispatch()))
+        for _ in range(self.workers):
+            self._tasks.append(loop.create_task(self._worker()))
+
+    def add(self, job, delay: float = 0) -> asyncio.Future:
+        self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        self._futures[job] = future
+
+        self.schedule(job=job, delay=delay)
+
+        return future
+
+    def schedule(self, job, delay: float) -> None:
+        due = asyncio.get_running_loop().time() + delay * self.time_scale
+
+        heapq.heappush(self._heap, (due, next(self._counter), job))
+
+        if self._heap[0][2] is job:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        tasks = self._tasks
+        self._tasks = []
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for future in self._futures.values():
+            if not future.done():
+                future.cancel()
+
+        self._futures.clear()
+        self._heap.clear()
+        self._running.clear()
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            self._wakeup.clear()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            due = self._heap[0][0]
+            if due > loop.time():
+                handle = loop.call_at(due, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    handle.cancel()
+                continue
+
+            _, _, job = heapq.heappop(self._heap)
+            self._ready.put_nowait(job)
+
+    async def _worker(self) -> None:
+        task = asyncio.current_task()
+
+        while True:
+            job = await self._ready.get()
+            self._running[task] = job
+
+            try:
+                delay = await job.step()
+            except Exception as error:
+                self._finish(job=job, error=error)
+                continue
+
+            if delay is None:
+                self._finish(job=job)
+            else:
+                self.schedule(job=job, delay=delay)
+
+    def _finish(self, job, error: Exception | None = None) -> None:
+        future = self._futures.pop(job, None)
+        if future is None or future.done():
+            return
+
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+
+scheduler = Scheduler(workers=settings.SCHEDULER_WORKERS)
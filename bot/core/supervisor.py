@@ -0,0 +1,217 @@
+import asyncio
+import multiprocessing
+import queue
+from zlib import crc32
+
+from loguru import logger as loguru_logger
+
+from bot.config import settings
+from bot.core.bootstrap import bootstrap_web_data, make_client
+from bot.core.scheduler import scheduler
+from bot.core.tapper import add_tapper
+from bot.utils.http_pool import http_pool
+from bot.utils.log_format import setup_logging
+from bot.utils.logger import logger
+from bot.utils.metrics import metrics
+from bot.utils.profiling import profiler
+from bot.utils.rate_limit import rate_limiter
+
+
+METRICS_REPORT_INTERVAL = 5
+
+
+def shard_key(session_name: str, proxy: str | None) -> str:
+    if settings.SHARD_BY == 'proxy':
+        return proxy or ''
+
+    return session_name
+
+
+def pick_worker(session_name: str, proxy: str | None, workers: list[int]) -> int:
+    # crc32 стабилен между запусками, в отличие от hash()
+    key = shard_key(session_name=session_name, proxy=proxy)
+
+    return workers[crc32(key.encode()) % len(workers)]
+
+
+def _configure_worker(index: int) -> None:
+    # Настройки воркера: экспорт метрик только в родителе, бюджет запросов
+    # делится между воркерами
+    workers = max(settings.WORKERS, 1)
+
+    settings.METRICS_PORT = 0
+    settings.METRICS_JSON_PATH = ''
+    # Этапы логирует родитель по сведённым метрикам, у профайлера каждого воркера свой порт
+    settings.PROFILE_LOG_INTERVAL = 0
+    if settings.PROFILER_PORT:
+        settings.PROFILER_PORT = settings.PROFILER_PORT + index + 1
+    settings.RATE_LIMIT_GLOBAL = settings.RATE_LIMIT_GLOBAL / workers
+    if settings.SHARD_BY != 'proxy':
+        settings.RATE_LIMIT_PER_PROXY = settings.RATE_LIMIT_PER_PROXY / workers
+
+    # Лимитер создан при импорте с полным бюджетом - пересоздаём корзины
+    rate_limiter.reset()
+
+
+def _worker_main(index: int, commands, events) -> None:
+    # Отдельный процесс со своим циклом событий: логи и метрики уходят родителю
+    _configure_worker(index=index)
+
+    def sink(message) -> None:
+        record = message.record
+        events.put(('log', record['level'].name, record['message']))
+
+    setup_logging(sink=sink)
+
+    try:
+        asyncio.run(_worker_loop(index=index, commands=commands, events=events))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(index: int, commands, events) -> None:
+    loop = asyncio.get_running_loop()
+    futures: dict[str, asyncio.Future] = {}
+
+    metrics.start()
+    profiler.start()
+
+    async def report_metrics() -> None:
+        while True:
+            await asyncio.sleep(METRICS_REPORT_INTERVAL)
+            events.put(('metrics', metrics.snapshot()))
+            metrics.reset()
+
+    reporter = loop.create_task(report_metrics())
+
+    def on_done(session_name: str) -> None:
+        events.put(('done', session_name))
+
+    while True:
+        command = await loop.run_in_executor(None, commands.get)
+        if command[0] == 'stop':
+            break
+
+        _, session_name, proxy = command
+        if session_name in futures:
+            continue
+
+        future = add_tapper(tg_client=make_client(session_name=session_name), proxy=proxy)
+        future.add_done_callback(lambda _, name=session_name: on_done(session_name=name))
+        futures[session_name] = future
+
+    reporter.cancel()
+    events.put(('metrics', metrics.snapshot()))
+
+    await scheduler.stop()
+    await http_pool.close()
+    profiler.stop()
+
+
+class Supervisor:
+    # Распределяет аккаунты по процессам (по имени сессии или по прокси),
+    # собирает их логи и метрики и перераспределяет аккаунты упавшего воркера
+    def __init__(self, accounts: list[tuple[str, str | None]], workers: int) -> None:
+        self.accounts = dict(accounts)
+        self.workers_count = max(workers, 1)
+
+        self._context = multiprocessing.get_context('spawn')
+        self.events = self._context.Queue()
+        self.workers: dict[int, tuple[multiprocessing.Process, multiprocessing.Queue]] = {}
+        self.assignment: dict[str, int] = {}
+        self.finished: set[str] = set()
+
+    def _spawn(self, index: int) -> None:
+        commands = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, commands, self.events),
+            name=f'tapper-worker-{index}',
+            daemon=True,
+        )
+        process.start()
+
+        self.workers[index] = (process, commands)
+
+    def _assign(self, session_name: str) -> None:
+        proxy = self.accounts[session_name]
+        index = pick_worker(session_name=session_name, proxy=proxy, workers=sorted(self.workers))
+
+        self.assignment[session_name] = index
+        self.workers[index][1].put(('add', session_name, proxy))
+
+    def _check_workers(self) -> None:
+        dead = [index for index, (process, _) in self.workers.items() if not process.is_alive()]
+        if not dead:
+            return
+
+        for index in dead:
+            process, _ = self.workers.pop(index)
+            logger.warning(f"Воркер <r>{index}</r> завершился с кодом {process.exitcode}, перераспределяем его аккаунты")
+
+        if not self.workers:
+            for index in dead:
+                self._spawn(index=index)
+
+        for session_name, index in list(self.assignment.items()):
+            if index in dead and session_name not in self.finished:
+                self._assign(session_name=session_name)
+
+    def _handle(self, event: tuple) -> None:
+        kind = event[0]
+
+        if kind == 'log':
+            loguru_logger.log(event[1], event[2])
+        elif kind == 'metrics':
+            metrics.merge(snapshot=event[1])
+        elif kind == 'done':
+            self.finished.add(event[1])
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        for index in range(self.workers_count):
+            self._spawn(index=index)
+
+        for session_name in self.accounts:
+            self._assign(session_name=session_name)
+
+        logger.info(f"Запущено <y>{self.workers_count}</y> воркеров для <y>{len(self.accounts)}</y> аккаунтов")
+
+        try:
+            while len(self.finished) < len(self.accounts):
+                try:
+                    event = await loop.run_in_executor(None, self.events.get, True, 1)
+                except queue.Empty:
+                    pass
+                else:
+                    self._handle(event=event)
+
+                self._check_workers()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        for process, commands in self.workers.values():
+            commands.put(('stop',))
+
+        for process, _ in self.workers.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+        self.workers.clear()
+
+
+async def run_supervisor(accounts: list[tuple[str, str | None]]) -> None:
+    setup_logging()
+    metrics.start()
+    profiler.start()
+
+    # Данные веб-приложения получаются заранее в родителе, воркеры читают их из кэша на диске
+    await bootstrap_web_data(
+        tg_clients=[make_client(session_name=session_name) for session_name, _ in accounts],
+        proxies=dict(accounts),
+    )
+
+    await Supervisor(accounts=accounts, workers=settings.WORKERS).run()
@@ -1,11 +1,9 @@
 import asyncio
-import heapq
+from collections import deque
 from random import randint
-from time import time
+from time import monotonic, time
 from datetime import datetime, timedelta
 
-import aiohttp
-from aiohttp_proxy import ProxyConnector
 from pyrogram import Client
 
 from bot.api.combo import claim_daily_combo, get_combo_cards
@@ -27,415 +25,843 @@ from bot.api.clicker import (
 )
 from bot.api.exchange import select_exchange
 from bot.api.tasks import get_nuxt_builds, get_tasks, get_daily
-from bot.utils.scripts import decode_cipher, get_headers
+from bot.core.bootstrap import bootstrap_web_data, make_client
+from bot.core.daily import DailyClaims, DailyJob, next_daily_reset, run_daily_jobs
+from bot.core.energy import EnergyModel
+from bot.core.planner import is_planner_available, plan_upgrades
+from bot.core.scheduler import scheduler
+from bot.core.upgrades import UpgradeIndex, is_upgrade_available, is_upgrade_profitable
+from bot.utils.scripts import get_headers
 from bot.utils.tg_web_data import get_tg_web_data
 from bot.utils.proxy import check_proxy
+from bot.utils.cache import combo_cards_ttl, decode_cipher_cached, shared_cache, web_data_cache, web_data_ttl
+from bot.utils.http_pool import http_pool
+from bot.utils.log_format import Dotted, TapLogAggregator, setup_logging
+from bot.utils.metrics import metrics
+from bot.utils.profiling import profiler
+from bot.utils.proxy_manager import proxy_manager
+from bot.utils.rate_limit import CircuitOpenError, backoff_delay
+from bot.utils.state import state_store
 
 
 class Tapper:
-    def __init__(self, tg_client: Client):
+    # Каждый шаг (тап, покупка карты, буст, ежедневные награды) - отдельная задача
+    # планировщика: метод выполняет одно действие, запоминает следующий шаг
+    # и возвращает задержку до него вместо asyncio.sleep
+
+    # Этапы для замеров времени шагов: несколько шагов одного действия
+    # складываются в один этап. Здесь должны быть все шаги, которые ставит _next:
+    # шаг без этапа попадает в метрики под своим именем
+    STAGES = {
+        '_start': 'login',
+        '_auth': 'login',
+        '_sync': 'sync',
+        '_daily_jobs': 'daily',
+        '_buy_combo_card': 'daily',
+        '_claim_daily_combo': 'daily',
+        '_tap': 'taps',
+        '_select_upgrade': 'upgrades',
+        '_buy_upgrade': 'upgrades',
+        '_check_energy': 'boosts',
+        '_apply_energy_boost': 'boosts',
+    }
+
+    def __init__(self, tg_client: Client, proxy: str | None = None):
         self.session_name = tg_client.name
         self.tg_client = tg_client
+        self.proxy = proxy
+        proxy_manager.register(session_name=self.session_name, proxy=proxy)
 
-    async def run(self, proxy: str | None) -> None:
-        access_token_created_time = 0
-        turbo_time = 0
-        active_turbo = False
+        self.headers = get_headers(name=self.tg_client.name)
+        self.http_client = None
+        self.tg_web_data = None
 
-        headers = get_headers(name=self.tg_client.name)
+        self.access_token_created_time = 0
+        self.synced_at = 0
+        self.turbo_time = 0
+        self.active_turbo = False
 
-        proxy_conn = ProxyConnector().from_url(proxy) if proxy else None
-        http_client = aiohttp.ClientSession(
-            headers=headers, connector=proxy_conn
-        )
+        self.game_config = {}
+        self.profile_data = {}
+        self.upgrades = UpgradeIndex()
+        self.daily_combo = None
+        self.balance = 0
+        self.earn_on_hour = 0
+        self.available_energy = 0
+        self.energy = EnergyModel()
+
+        self.daily_claims = DailyClaims()
+
+        self._combo_cards = []
+        self._combo_claimed_until = 0
+        self._upgrades_left = 0
+        self._pending_upgrade = None
+        self._upgrade_plan = None
+        self._upgrade_batch = False
+        self._failures = 0
+        self._hibernated = False
+        self._tap_log = TapLogAggregator(session_name=self.session_name, every=settings.LOG_TAPS_EVERY)
+
+        self._job = self._start
+        self.stage = None
+
+    def _next(self, job, delay: float) -> float:
+        self._job = job
+        return delay
+
+    async def step(self) -> float:
+        job = self._job
+        started = monotonic()
+        self.stage = self.STAGES.get(job.__name__, job.__name__)
+
+        try:
+            if self._hibernated:
+                self._rehydrate()
+
+            if self.http_client is None or self.http_client.closed:
+                self.http_client = http_pool.get_client(proxy=self.proxy, headers=self.headers)
+
+            delay = await job()
+
+        except InvalidSession as error:
+            raise error
+
+        except CircuitOpenError as error:
+            if self.proxy and error.name == f'proxy {self.proxy}' and self._switch_proxy(force=True):
+                return backoff_delay(attempt=1)
+
+            return error.retry_after + backoff_delay(attempt=1)
+
+        except Exception as error:
+            logger.error(f"{self.session_name} | Неизвестная ошибка: {error}")
+            self._switch_proxy()
+            return self._backoff()
 
-        if proxy:
+        finally:
+            metrics.observe_stage(stage=self.stage, duration=monotonic() - started)
+
+        self._failures = 0
+
+        # Оценка прокси обновляется каждым запросом, поэтому проверяем её после
+        # каждого шага: с медленного или сбоящего прокси уходим сразу, а не перед сном
+        self._switch_proxy()
+
+        return delay
+
+    def _switch_proxy(self, force: bool = False) -> bool:
+        # Переход на другой прокси, если текущий деградировал; клиент
+        # для нового прокси создаётся в step() перед следующим шагом
+        if not self.proxy:
+            return False
+
+        proxy = proxy_manager.reassign(session_name=self.session_name, proxy=self.proxy, force=force)
+        if proxy == self.proxy:
+            return False
+
+        self.proxy = proxy
+        self.http_client = None
+
+        return True
+
+    def _backoff(self) -> float:
+        self._failures += 1
+        metrics.record_retry(stage=self._job.__name__)
+
+        return backoff_delay(attempt=self._failures)
+
+    async def _start(self) -> float:
+        if self.proxy:
             await check_proxy(
-                http_client=http_client,
-                proxy=proxy,
+                http_client=self.http_client,
+                proxy=self.proxy,
                 session_name=self.session_name,
             )
 
-        tg_web_data = await get_tg_web_data(
-            tg_client=self.tg_client,
-            proxy=proxy,
+        return self._next(self._tap, self._restore_state())
+
+    def _restore_state(self) -> float:
+        state = state_store.load(session_name=self.session_name)
+        if not state:
+            return 0
+
+        self.daily_claims = DailyClaims(claims=state['daily_claims'])
+
+        if state['headers']:
+            # Тот же User-Agent, что и в прошлый запуск, - токен выдан под него
+            self.headers = state['headers']
+            self.http_client = http_pool.get_client(proxy=self.proxy, headers=self.headers)
+
+        if not state['access_token']:
+            return 0
+
+        if time() - (state['token_created_at'] or 0) >= settings.TOKEN_TTL:
+            return 0
+
+        self._set_access_token(access_token=state['access_token'], created_time=state['token_created_at'])
+
+        if state['profile'] and state['upgrades']:
+            self._apply_profile(profile_data=state['profile'])
+            self.upgrades.update(state['upgrades'])
+            self.synced_at = time()
+
+        logger.info(f"{self.session_name} | Состояние восстановлено, повторный вход не требуется")
+
+        return max((state['next_wake_at'] or 0) - time(), 0)
+
+    def _save_state(self, next_wake_at: float = 0) -> None:
+        state_store.save(
+            session_name=self.session_name,
+            access_token=self.headers['Authorization'].removeprefix('Bearer '),
+            token_created_at=self.access_token_created_time,
+            headers={name: value for name, value in self.headers.items() if name != 'Authorization'},
+            profile=self.profile_data,
+            upgrades=self.upgrades.to_dicts(),
+            daily_claims=self.daily_claims.to_dict(),
+            next_wake_at=next_wake_at,
+        )
+
+    def _hibernate(self) -> None:
+        # Долгий сон: состояние уже сохранено в StateStore, поэтому выгружаем из памяти
+        # клиент Telegram, карты, конфиг, профиль и заголовки. Всё это восстанавливается
+        # при пробуждении (_rehydrate) или заново запрашивается при синхронизации
+        self.tg_client = None
+        self.http_client = None
+        self.headers = None
+        self.game_config = None
+        self.profile_data = None
+        self.upgrades = None
+        self.daily_combo = None
+        self._upgrade_plan = None
+        self._pending_upgrade = None
+
+        self._hibernated = True
+
+    def _rehydrate(self) -> None:
+        # Флаг снимается только после успешного чтения: при ошибке step()
+        # повторит восстановление на следующем шаге
+        state = state_store.load(session_name=self.session_name) or {}
+
+        # Заголовки (User-Agent) сохраняются вместе с токеном, чтобы отпечаток
+        # аккаунта не менялся при каждом пробуждении
+        self.headers = state.get('headers') or get_headers(name=self.session_name)
+        self.game_config = {}
+        self.profile_data = {}
+        self.upgrades = UpgradeIndex()
+
+        if state.get('access_token'):
+            self.headers['Authorization'] = f"Bearer {state['access_token']}"
+
+        if state.get('profile'):
+            # Модель энергии не выгружалась и точнее сохранённого профиля
+            self.profile_data = state['profile']
+            self.earn_on_hour = self.profile_data['earnPassivePerHour']
+
+        if state.get('upgrades'):
+            self.upgrades.update(state['upgrades'])
+
+        self._hibernated = False
+
+    def _set_access_token(self, access_token: str, created_time: float) -> None:
+        self.headers['Authorization'] = f'Bearer {access_token}'
+        self.http_client.headers['Authorization'] = f'Bearer {access_token}'
+        self.http_client.unauthorized = False
+
+        self.access_token_created_time = created_time
+
+    def _apply_profile(self, profile_data: dict) -> None:
+        self.profile_data = profile_data
+        self.earn_on_hour = profile_data['earnPassivePerHour']
+        self.available_energy = profile_data.get('availableTaps', 0)
+        self.balance = int(profile_data.get('balanceCoins', 0))
+        self.energy.update(profile_data=profile_data)
+
+    def _is_token_expired(self) -> bool:
+        return (
+            self.http_client.unauthorized
+            or time() - self.access_token_created_time >= settings.TOKEN_TTL
+        )
+
+    async def _auth(self) -> float:
+        if self.tg_web_data is None:
+            if self.tg_client is None:
+                self.tg_client = make_client(session_name=self.session_name)
+
+            # Данные могли быть получены заранее при запуске (bootstrap_web_data)
+            self.tg_web_data = await web_data_cache.get_or_fetch(
+                key=self.session_name,
+                fetch=lambda: get_tg_web_data(
+                    tg_client=self.tg_client,
+                    proxy=self.proxy,
+                    session_name=self.session_name,
+                ),
+                ttl=web_data_ttl,
+            )
+
+        await shared_cache.get_or_fetch(
+            key='nuxt_builds',
+            fetch=lambda: get_nuxt_builds(http_client=self.http_client),
+            ttl=settings.SHARED_CACHE_TTL,
+        )
+
+        access_token = await login(
+            http_client=self.http_client,
+            tg_web_data=self.tg_web_data,
+            session_name=self.session_name,
+        )
+
+        if not access_token:
+            # Данные веб-приложения могли устареть - при следующей попытке запросим новые
+            self.tg_web_data = None
+            web_data_cache.delete(key=self.session_name)
+            return self._backoff()
+
+        self._set_access_token(access_token=access_token, created_time=time())
+
+        await get_me_telegram(http_client=self.http_client)
+
+        return self._next(self._sync, 0)
+
+    async def _sync(self) -> float:
+        self.game_config = await get_config(http_client=self.http_client)
+
+        self._apply_profile(profile_data=await get_profile_data(http_client=self.http_client))
+
+        last_passive_earn = self.profile_data['lastPassiveEarn']
+
+        # Форматируем числа как целые с разделением тысяч через точку
+        last_passive_earn_str = f"{int(last_passive_earn):,}".replace(',', '.')
+        earn_on_hour_str = f"{int(self.earn_on_hour):,}".replace(',', '.')
+
+        logger.info(f"{self.session_name} | Последний пассивный доход: <g>+{last_passive_earn_str}</g> | Доход каждый час: <y>{earn_on_hour_str}</y>")
+
+        upgrades_data = await get_upgrades(http_client=self.http_client)
+
+        self.upgrades.update(upgrades_data['upgradesForBuy'])
+        self.daily_combo = upgrades_data.get('dailyCombo')
+
+        self.synced_at = time()
+
+        # Состояние сохраняется один раз после ежедневных заданий
+        return self._next(self._daily_jobs, 0)
+
+    async def _daily_jobs(self) -> float:
+        jobs = [
+            DailyJob(name='combo', run=self._daily_combo),
+            DailyJob(name='daily_reward', run=self._daily_reward),
+            DailyJob(name='cipher', run=self._daily_cipher),
+            DailyJob(name='exchange', run=self._select_exchange),
+        ]
+
+        await run_daily_jobs(
+            jobs=jobs,
+            claims=self.daily_claims,
+            concurrency=settings.DAILY_JOBS_CONCURRENCY,
             session_name=self.session_name,
         )
 
-        while True:
-            try:
-                if http_client.closed:
-                    if proxy_conn:
-                        if not proxy_conn.closed:
-                            proxy_conn.close()
-
-                    proxy_conn = (
-                        ProxyConnector().from_url(proxy) if proxy else None
-                    )
-                    http_client = aiohttp.ClientSession(
-                        headers=headers, connector=proxy_conn
-                    )
-
-                if time() - access_token_created_time >= 3600:
-                    await get_nuxt_builds(http_client=http_client)
-
-                    access_token = await login(
-                        http_client=http_client,
-                        tg_web_data=tg_web_data,
-                        session_name=self.session_name,
-                    )
-
-                    if not access_token:
-                        continue
-
-                    http_client.headers[
-                        'Authorization'
-                    ] = f'Bearer {access_token}'
-
-                    access_token_created_time = time()
-
-                    await get_me_telegram(http_client=http_client)
-                    game_config = await get_config(http_client=http_client)
-
-                    profile_data = await get_profile_data(
-                        http_client=http_client
-                    )
-
-                    last_passive_earn = profile_data['lastPassiveEarn']
-                    earn_on_hour = profile_data['earnPassivePerHour']
-
-                    # Форматируем числа как целые с разделением тысяч через точку
-                    last_passive_earn_str = f"{int(last_passive_earn):,}".replace(',', '.')
-                    earn_on_hour_str = f"{int(earn_on_hour):,}".replace(',', '.')
-
-                    logger.info(f"{self.session_name} | Последний пассивный доход: <g>+{last_passive_earn_str}</g> | Доход каждый час: <y>{earn_on_hour_str}</y>")
-
-                    available_energy = profile_data.get('availableTaps', 0)
-                    balance = int(profile_data.get('balanceCoins', 0))
-
-                    upgrades_data = await get_upgrades(http_client=http_client)
-
-                    upgrades = upgrades_data['upgradesForBuy']
-                    daily_combo = upgrades_data.get('dailyCombo')
-                    if daily_combo:
-                        bonus = daily_combo['bonusCoins']
-                        is_claimed = daily_combo['isClaimed']
-                        upgraded_list = daily_combo['upgradeIds']
-
-                        if not is_claimed:
-                            combo_cards = await get_combo_cards(
-                                http_client=http_client
-                            )
-
-                            cards = combo_cards['combo']
-                            date = combo_cards['date']
-
-                            available_combo_cards = [
-                                data for data in upgrades
-                                if data['isAvailable'] is True
-                                and data['id'] in cards
-                                and data['id'] not in upgraded_list
-                                and data['isExpired'] is False
-                                and data.get('cooldownSeconds', 0) == 0
-                                and data.get('maxLevel', data['level']) >= data['level']
-                                and (
-                                    data.get('condition') is None
-                                    or data['condition'].get('_type') != 'SubscribeTelegramChannel'
-                                )
-                            ]
-
-                            start_bonus_round = datetime.strptime(date, "%d-%m-%y").replace(hour=15)
-                            end_bonus_round = start_bonus_round + timedelta(days=1)
-
-                            if start_bonus_round <= datetime.now() < end_bonus_round:
-                                common_price = sum([upgrade['price'] for upgrade in available_combo_cards])
-                                need_cards_count = len(cards)
-                                possible_cards_count = len(available_combo_cards)
-                                is_combo_accessible = need_cards_count == possible_cards_count
-
-                                if not is_combo_accessible:
-                                    logger.info(f"{self.session_name} | "
-                                                f"<r>Ежедневное комбо не применимо</r>, вы можете купить только {possible_cards_count} из {need_cards_count} карт!")
-
-                                if balance < common_price:
-                                    logger.info(f"{self.session_name} | "
-                                                f"<r>Ежедневное комбо не применимо</r>, у вас недостаточно монет. Нужно <y>{common_price:,}</y> монет, а у вас всего <r>{balance:,}</r> монет!")
-
-                                if common_price < bonus and balance > common_price and is_combo_accessible:
-                                    for upgrade in available_combo_cards:
-                                        upgrade_id = upgrade['id']
-                                        level = upgrade['level']
-                                        price = upgrade['price']
-                                        profit = upgrade['profitPerHourDelta']
-
-                                        logger.info(f"{self.session_name} | "
-                                                    f"Спим 5 сек. перед покупкой <r>комбо</r> карт <e>{upgrade_id}</e>")
-
-                                        await asyncio.sleep(delay=5)
-
-                                        status, upgrades = await buy_upgrade(
-                                            http_client=http_client,
-                                            upgrade_id=upgrade_id,
-                                        )
-
-                                        if status is True:
-                                            earn_on_hour += profit
-                                            balance -= price                                                                            
-                                            price_str = f"{price:,}".replace(',', '.')
-                                            earn_on_hour_str = f"{earn_on_hour:,}".replace(',', '.')
-                                            balance_str = f"{balance:,}".replace(',', '.')
-                                            profit_str = f"{profit:,}".replace(',', '.')
-                                    
-                                            logger.success(
-                                                    f"{self.session_name} | "
-                                                    f"Успешно улучшено <e>{upgrade_id}</e> с ценой <r>{price_str}</r> до <m>{level}</m> уровня | "
-                                                    f"Оставшиеся деньги: <e>{balance_str}</e>")
-
-
-                                            await asyncio.sleep(delay=1)
-
-                                            await asyncio.sleep(delay=2)
-
-                                    status = await claim_daily_combo(
-                                        http_client=http_client
-                                    )
-                                    if status is True:
-                                        logger.success(f"{self.session_name} | Успешно собрано ежедневное комбо | "
-                                                       f"Бонус: <g>+{bonus:,}</g>")
-
-                    tasks = await get_tasks(http_client=http_client)
-
-                    daily_task = tasks[-1]
-                    rewards = daily_task['rewardsByDays']
-                    is_completed = daily_task['isCompleted']
-                    days = daily_task['days']
-
-                    await asyncio.sleep(delay=2)
-
-                    if is_completed is False:
-                        status = await get_daily(http_client=http_client)
-                        if status is True:
-                            logger.success(f"{self.session_name} | Успешно получено ежедневная награда | Дни: <m>{days}</m> | Награда в монетах: {rewards[days - 1]['rewardCoins']}")
-
-                    await asyncio.sleep(delay=2)
-
-                    daily_cipher = game_config.get('dailyCipher')
-                    if daily_cipher:
-                        cipher = daily_cipher['cipher']
-                        bonus = daily_cipher['bonusCoins']
-                        is_claimed = daily_cipher['isClaimed']
-
-                        if not is_claimed and cipher:
-                            decoded_cipher = decode_cipher(cipher=cipher)
-
-                            status = await claim_daily_cipher(
-                                http_client=http_client, cipher=decoded_cipher
-                            )
-                            if status is True:
-                                logger.success(f"{self.session_name} | "
-                                               f"Успешно собран ежедневный шифр: <y>{decoded_cipher}</y> | "
-                                               f"Бонус: <g>+{bonus:,}</g>")
-
-                        await asyncio.sleep(delay=2)
-
-                    exchange_id = profile_data.get('exchangeId')
-                    if not exchange_id:
-                        status = await select_exchange(
-                            http_client=http_client, exchange_id='bybit'
-                        )
-                        if status is True:
-                            logger.success(f"{self.session_name} | Успешно выбрана биржа <y>Bybit</y>")
-
-                taps = randint(
-                    a=settings.RANDOM_TAPS_COUNT[0],
-                    b=settings.RANDOM_TAPS_COUNT[1],
-                )
-
-                if active_turbo:
-                    taps += settings.ADD_TAPS_ON_TURBO
-                    if time() - turbo_time > 20:
-                        active_turbo = False
-                        turbo_time = 0
-
-                player_data = await send_taps(
-                    http_client=http_client,
-                    available_energy=available_energy,
-                    taps=taps,
-                )
-
-                if not player_data:
-                    continue
-
-                available_energy = player_data.get('availableTaps', 0)
-                new_balance = int(player_data.get('balanceCoins', 0))
-                calc_taps = new_balance - balance
-                balance = new_balance
-                total = int(player_data.get('totalCoins', 0))
-                earn_on_hour = player_data['earnPassivePerHour']
-
-                balance_str = f"{balance:,}".replace(',', '.')
-                calc_taps_str = f"{calc_taps:,}".replace(',', '.')
-                total_str = f"{total:,}".replace(',', '.')
-                # Activate buying upgrades on new accounts
-                if earn_on_hour == 0:
-                    earn_on_hour = 100
-
-                logger.success(f"{self.session_name} | Успешный тап! | Баланс: <c>{balance_str}</c> (<g>+{calc_taps_str}</g>) | Всего: <e>{total_str}</e>")
-
-                if active_turbo is False:
-                    if settings.AUTO_UPGRADE is True:
-                        failed_attempts = 0
-                        for _ in range(settings.UPGRADES_COUNT):
-                            available_upgrades = [
-                                data
-                                for data in upgrades
-                                if data['isAvailable'] is True
-                                   and data['isExpired'] is False
-                                   and data.get('cooldownSeconds', 0) == 0
-                                   and data.get('maxLevel', data['level'])
-                                   >= data['level']
-                                   and (
-                                           data.get('condition') is None
-                                           or data['condition'].get('_type')
-                                           != 'SubscribeTelegramChannel'
-                                   )
-                            ]
-
-                            queue = []
-
-                            for upgrade in available_upgrades:
-                                upgrade_id = upgrade['id']
-                                level = upgrade['level']
-                                price = upgrade['price']
-                                profit = upgrade['profitPerHourDelta']
-
-                                significance = profit / max(price, 1)
-
-                                free_money = balance - settings.BALANCE_TO_SAVE
-                                max_price_limit = earn_on_hour * 5
-
-                                if (
-                                        (free_money * 0.7) >= price
-                                        and level <= settings.MAX_LEVEL
-                                        and profit > 0
-                                        and price < settings.MAX_UPGRADE_PRICE
-                                        and price < max_price_limit):
-                                    heapq.heappush(queue, (-significance, upgrade_id, upgrade))
-
-                            if not queue:
-                                continue
-
-                            top_card = heapq.nsmallest(1, queue)[0]
-
-                            upgrade = top_card[2]
-
-                            upgrade_id = upgrade['id']
-                            level = upgrade['level']
-                            price = upgrade['price']
-                            profit = upgrade['profitPerHourDelta']
-
-                            logger.info(f"{self.session_name} | Спим 5 секунд перед улучшением <e>{upgrade_id}</e>")
-                            await asyncio.sleep(delay=5)
-
-                            status, upgrades = await buy_upgrade(
-                                http_client=http_client, upgrade_id=upgrade_id
-                            )
-
-                            if status is True:
-                                earn_on_hour += profit
-                                balance -= price
-                                
-                                price_str = f"{price:,}".replace(',', '.')
-                                earn_on_hour_str = f"{earn_on_hour:,}".replace(',', '.')
-                                balance_str = f"{balance:,}".replace(',', '.')
-                                profit_str = f"{profit:,}".replace(',', '.')
-                                    
-                                logger.success(
-                                        f"{self.session_name} | "
-                                        f"Успешно улучшено <e>{upgrade_id}</e> с ценой <r>{price_str}</r> до <m>{level}</m> уровня | "
-                                        f"Оставшиеся деньги: <e>{balance_str}</e>")
-                                await asyncio.sleep(delay=1)
-                            else:
-                                failed_attempts += 1
-                                if failed_attempts >= len(available_upgrades):
-                                    continue
-
-                    if available_energy < settings.MIN_AVAILABLE_ENERGY:
-                        boosts = await get_boosts(http_client=http_client)
-                        energy_boost = next(
-                            (
-                                boost
-                                for boost in boosts
-                                if boost['id'] == 'BoostFullAvailableTaps'
-                            ),
-                            {},
-                        )
-
-                        if (
-                                settings.APPLY_DAILY_ENERGY is True
-                                and energy_boost.get('cooldownSeconds', 0) == 0
-                                and energy_boost.get('level', 0)
-                                <= energy_boost.get('maxLevel', 0)
-                        ):
-                            logger.info(
-                                f'{self.session_name} | Спим 5 сек. перед применением буста энергии'
-                            )
-                            await asyncio.sleep(delay=5)
-
-                            status = await apply_boost(
-                                http_client=http_client,
-                                boost_id='BoostFullAvailableTaps',
-                            )
-                            if status is True:
-                                logger.success(f"{self.session_name} | Успешно применён буст энергии")
-
-                                await asyncio.sleep(delay=1)
-
-                                continue
-
-                        await http_client.close()
-                        if proxy_conn:
-                            if not proxy_conn.closed:
-                                proxy_conn.close()
-
-                        random_sleep = randint(
-                            settings.SLEEP_BY_MIN_ENERGY[0],
-                            settings.SLEEP_BY_MIN_ENERGY[1],
-                        )
-
-                        logger.info(
-                            f'{self.session_name} | Минимальная энергия достигнута: <y>{available_energy}</y>'
-                        )
-                        logger.info(
-                            f'{self.session_name} | Спим {random_sleep:,} сек.'
-                        )
-
-                        await asyncio.sleep(delay=random_sleep)
-
-                        access_token_created_time = 0
-
-            except InvalidSession as error:
-                raise error
-
-            except Exception as error:
-                logger.error(f"{self.session_name} | Неизвестная ошибка: {error}")
-                await asyncio.sleep(delay=3)
-
-            else:
-                sleep_between_clicks = randint(
-                    a=settings.SLEEP_BETWEEN_TAP[0],
-                    b=settings.SLEEP_BETWEEN_TAP[1],
-                )
-
-                if active_turbo is True:
-                    sleep_between_clicks = 4
-
-                logger.info(f'Спим {sleep_between_clicks} сек.')
-                await asyncio.sleep(delay=sleep_between_clicks)
+        self._save_state()
+
+        if self._combo_cards:
+            return self._announce_combo_card()
+
+        return self._next(self._tap, 0)
+
+    async def _daily_combo(self) -> float | None:
+        daily_combo = self.daily_combo
+        if not daily_combo:
+            return None
+
+        if daily_combo['isClaimed']:
+            return next_daily_reset()
+
+        bonus = daily_combo['bonusCoins']
+        upgraded_list = daily_combo['upgradeIds']
+
+        combo_cards = await shared_cache.get_or_fetch(
+            key='combo_cards',
+            fetch=lambda: get_combo_cards(http_client=self.http_client),
+            ttl=combo_cards_ttl,
+        )
+
+        cards = combo_cards['combo']
+        date = combo_cards['date']
+
+        available_combo_cards = [
+            data for data in self.upgrades
+            if data['id'] in cards
+            and data['id'] not in upgraded_list
+            and is_upgrade_available(data)
+        ]
+
+        start_bonus_round = datetime.strptime(date, "%d-%m-%y").replace(hour=15)
+        end_bonus_round = start_bonus_round + timedelta(days=1)
+
+        if not start_bonus_round <= datetime.now() < end_bonus_round:
+            return None
+
+        common_price = sum([upgrade['price'] for upgrade in available_combo_cards])
+        need_cards_count = len(cards)
+        possible_cards_count = len(available_combo_cards)
+        is_combo_accessible = need_cards_count == possible_cards_count
+
+        if not is_combo_accessible:
+            logger.info(f"{self.session_name} | "
+                        f"<r>Ежедневное комбо не применимо</r>, вы можете купить только {possible_cards_count} из {need_cards_count} карт!")
+
+        if self.balance < common_price:
+            logger.info(f"{self.session_name} | "
+                        f"<r>Ежедневное комбо не применимо</r>, у вас недостаточно монет. Нужно <y>{common_price:,}</y> монет, а у вас всего <r>{self.balance:,}</r> монет!")
+
+        if common_price < bonus and self.balance > common_price and is_combo_accessible:
+            # Карты покупаются по одной с паузами уже после остальных заданий
+            self._combo_cards = available_combo_cards
+            self._combo_claimed_until = end_bonus_round.timestamp()
+
+        return None
+
+    def _announce_combo_card(self) -> float:
+        upgrade_id = self._combo_cards[0]['id']
+
+        logger.info(f"{self.session_name} | "
+                    f"Спим 5 сек. перед покупкой <r>комбо</r> карт <e>{upgrade_id}</e>")
+
+        return self._next(self._buy_combo_card, 5)
+
+    async def _buy_combo_card(self) -> float:
+        upgrade = self._combo_cards[0]
+
+        upgrade_id = upgrade['id']
+        level = upgrade['level']
+        price = upgrade['price']
+        profit = upgrade['profitPerHourDelta']
+
+        status, upgrades = await buy_upgrade(
+            http_client=self.http_client,
+            upgrade_id=upgrade_id,
+        )
+
+        # Карта снимается только после ответа: при ошибке step() повторит ту же покупку
+        self._combo_cards.pop(0)
+
+        if upgrades:
+            self.upgrades.update(upgrades)
+
+        delay = 0
+        if status is True:
+            self.earn_on_hour += profit
+            self.balance -= price
+            price_str = f"{price:,}".replace(',', '.')
+            balance_str = f"{self.balance:,}".replace(',', '.')
+
+            logger.success(
+                    f"{self.session_name} | "
+                    f"Успешно улучшено <e>{upgrade_id}</e> с ценой <r>{price_str}</r> до <m>{level}</m> уровня | "
+                    f"Оставшиеся деньги: <e>{balance_str}</e>")
+
+            delay = 3
+
+        if self._combo_cards:
+            return self._announce_combo_card() + delay
+
+        return self._next(self._claim_daily_combo, delay)
+
+    async def _claim_daily_combo(self) -> float:
+        status = await claim_daily_combo(http_client=self.http_client)
+        if status is True:
+            logger.success(f"{self.session_name} | Успешно собрано ежедневное комбо | "
+                           f"Бонус: <g>+{self.daily_combo['bonusCoins']:,}</g>")
+
+            self.daily_claims.claim(name='combo', until=self._combo_claimed_until)
+            self._save_state()
+
+        return self._next(self._tap, 0)
+
+    async def _daily_reward(self) -> float | None:
+        tasks = await get_tasks(http_client=self.http_client)
+
+        daily_task = tasks[-1]
+        if daily_task['isCompleted'] is True:
+            return next_daily_reset()
+
+        rewards = daily_task['rewardsByDays']
+        days = daily_task['days']
+
+        status = await get_daily(http_client=self.http_client)
+        if status is not True:
+            return None
+
+        logger.success(f"{self.session_name} | Успешно получено ежедневная награда | Дни: <m>{days}</m> | Награда в монетах: {rewards[days - 1]['rewardCoins']}")
+
+        return next_daily_reset()
+
+    async def _daily_cipher(self) -> float | None:
+        daily_cipher = self.game_config.get('dailyCipher')
+        if not daily_cipher:
+            return None
+
+        cipher = daily_cipher['cipher']
+        bonus = daily_cipher['bonusCoins']
+        is_claimed = daily_cipher['isClaimed']
+
+        # Сервер сообщает время до нового шифра, иначе ждём общего сброса
+        remain_seconds = daily_cipher.get('remainSeconds')
+        claimed_until = time() + remain_seconds if remain_seconds else next_daily_reset()
+
+        if is_claimed:
+            return claimed_until
+
+        if not cipher:
+            return None
+
+        decoded_cipher = decode_cipher_cached(cipher=cipher)
+
+        status = await claim_daily_cipher(
+            http_client=self.http_client, cipher=decoded_cipher
+        )
+        if status is not True:
+            return None
+
+        logger.success(f"{self.session_name} | "
+                       f"Успешно собран ежедневный шифр: <y>{decoded_cipher}</y> | "
+                       f"Бонус: <g>+{bonus:,}</g>")
+
+        return claimed_until
+
+    async def _select_exchange(self) -> float | None:
+        exchange_id = self.profile_data.get('exchangeId')
+        if not exchange_id:
+            status = await select_exchange(
+                http_client=self.http_client, exchange_id='bybit'
+            )
+            if status is not True:
+                return None
+
+            logger.success(f"{self.session_name} | Успешно выбрана биржа <y>Bybit</y>")
+
+        return next_daily_reset()
+
+    async def _tap(self) -> float:
+        if self._is_token_expired():
+            return self._next(self._auth, 0)
+
+        if time() - self.synced_at >= 3600:
+            return self._next(self._sync, 0)
+
+        if settings.USE_ENERGY_MODEL is True and self.energy.is_known:
+            # Тратим всю накопленную энергию одним запросом
+            taps = self.energy.taps_available()
+            available_energy = int(self.energy.energy_at())
+
+            if taps <= 0 and not self.active_turbo:
+                return self._next(self._check_energy, 0)
+        else:
+            taps = randint(
+                a=settings.RANDOM_TAPS_COUNT[0],
+                b=settings.RANDOM_TAPS_COUNT[1],
+            )
+            available_energy = self.available_energy
+
+        if self.active_turbo:
+            taps += settings.ADD_TAPS_ON_TURBO
+            if time() - self.turbo_time > 20:
+                self.active_turbo = False
+                self.turbo_time = 0
+
+        player_data = await send_taps(
+            http_client=self.http_client,
+            available_energy=available_energy,
+            taps=taps,
+        )
+
+        if not player_data:
+            return self._backoff()
+
+        self.profile_data = player_data
+        self.available_energy = player_data.get('availableTaps', 0)
+        self.energy.update(profile_data=player_data, now=time())
+        new_balance = int(player_data.get('balanceCoins', 0))
+        calc_taps = new_balance - self.balance
+        self.balance = new_balance
+        total = int(player_data.get('totalCoins', 0))
+        self.earn_on_hour = player_data['earnPassivePerHour']
+
+        metrics.record_taps(session_name=self.session_name, taps=taps, coins=calc_taps)
+        metrics.set_earn_on_hour(session_name=self.session_name, earn_on_hour=self.earn_on_hour)
+
+        # Activate buying upgrades on new accounts
+        if self.earn_on_hour == 0:
+            self.earn_on_hour = 100
+
+        self._tap_log.add(taps=taps, coins=calc_taps, balance=self.balance, total=total)
+
+        if self.active_turbo is True:
+            return self._sleep_between_taps()
+
+        if settings.AUTO_UPGRADE is True:
+            self._upgrades_left = settings.UPGRADES_COUNT
+            self._upgrade_plan = None
+
+            return self._next(self._select_upgrade, 0)
+
+        return self._next(self._check_energy, 0)
+
+    async def _select_upgrade(self) -> float:
+        if self._upgrades_left <= 0:
+            return self._next(self._check_energy, 0)
+
+        max_price = self.upgrades.max_price(balance=self.balance, earn_on_hour=self.earn_on_hour)
+
+        # План составляется на первом выборе круга, чтобы его время шло в этап upgrades
+        if self._upgrades_left == settings.UPGRADES_COUNT:
+            if is_planner_available():
+                self._plan_upgrades()
+            elif settings.UPGRADES_COUNT > 1:
+                self._select_batch(max_price=max_price)
+
+        self._upgrades_left -= 1
+
+        if self._upgrade_plan is None:
+            self._pending_upgrade = self.upgrades.best(max_price=max_price)
+        elif self._upgrade_batch:
+            # Набор уже уложен в бюджет круга: карты проверяются только по оставшимся деньгам
+            self._pending_upgrade = self._next_planned_upgrade(max_price=self.balance - settings.BALANCE_TO_SAVE)
+        else:
+            self._pending_upgrade = self._next_planned_upgrade(max_price=max_price)
+
+        if self._pending_upgrade is None:
+            return self._next(self._check_energy, 0)
+
+        logger.info("{session} | Спим 5 секунд перед улучшением <e>{upgrade_id}</e>",
+                    session=self.session_name, upgrade_id=self._pending_upgrade['id'])
+
+        return self._next(self._buy_upgrade, 5)
+
+    def _plan_upgrades(self) -> None:
+        started = monotonic()
+
+        self._upgrade_plan = deque(plan_upgrades(
+            upgrades=self.upgrades,
+            balance=self.balance,
+            earn_on_hour=self.earn_on_hour,
+            count=settings.UPGRADES_COUNT,
+        ))
+        self._upgrade_batch = False
+
+        # Отдельно от шага целиком - это самая дорогая по CPU часть выбора карт
+        metrics.observe_stage(stage='planner', duration=monotonic() - started)
+
+    def _select_batch(self, max_price: int) -> None:
+        started = monotonic()
+
+        self._upgrade_plan = deque(self.upgrades.select_batch(
+            budget=self.balance - settings.BALANCE_TO_SAVE,
+            max_price=max_price,
+            count=settings.UPGRADES_COUNT,
+        ))
+        self._upgrade_batch = True
+
+        metrics.observe_stage(stage='planner', duration=monotonic() - started)
+
+    def _next_planned_upgrade(self, max_price: int) -> dict | None:
+        # План составлен по ценам на момент тапа: карта могла подорожать
+        # или покупка предыдущего уровня не прошла - такие шаги пропускаем
+        while self._upgrade_plan:
+            planned = self._upgrade_plan.popleft()
+            upgrade = self.upgrades.get(planned['id'])
+
+            if (
+                upgrade is not None
+                and upgrade['level'] == planned['level']
+                and upgrade['price'] <= max_price
+                and is_upgrade_profitable(upgrade)
+            ):
+                return upgrade
+
+        return None
+
+    async def _buy_upgrade(self) -> float:
+        upgrade = self._pending_upgrade
+
+        upgrade_id = upgrade['id']
+        level = upgrade['level']
+        price = upgrade['price']
+        profit = upgrade['profitPerHourDelta']
+
+        status, upgrades = await buy_upgrade(
+            http_client=self.http_client, upgrade_id=upgrade_id
+        )
+
+        # Карта снимается только после ответа: при ошибке step() повторит ту же покупку
+        self._pending_upgrade = None
+
+        if upgrades:
+            self.upgrades.update(upgrades)
+
+        if status is True:
+            self.earn_on_hour += profit
+            self.balance -= price
+
+            logger.success("{session} | Успешно улучшено <e>{upgrade_id}</e> с ценой <r>{price}</r> до <m>{level}</m> уровня | "
+                           "Оставшиеся деньги: <e>{balance}</e>",
+                           session=self.session_name, upgrade_id=upgrade_id, price=Dotted(price),
+                           level=level, balance=Dotted(self.balance))
+
+            return self._next(self._select_upgrade, 1)
+
+        return self._next(self._select_upgrade, 0)
+
+    async def _check_energy(self) -> float:
+        if self.available_energy >= settings.MIN_AVAILABLE_ENERGY:
+            return self._sleep_between_taps()
+
+        boosts = await get_boosts(http_client=self.http_client)
+        energy_boost = next(
+            (
+                boost
+                for boost in boosts
+                if boost['id'] == 'BoostFullAvailableTaps'
+            ),
+            {},
+        )
+
+        if (
+                settings.APPLY_DAILY_ENERGY is True
+                and energy_boost.get('cooldownSeconds', 0) == 0
+                and energy_boost.get('level', 0)
+                <= energy_boost.get('maxLevel', 0)
+        ):
+            logger.info(
+                f'{self.session_name} | Спим 5 сек. перед применением буста энергии'
+            )
+            return self._next(self._apply_energy_boost, 5)
+
+        return await self._sleep_until_energy()
+
+    async def _apply_energy_boost(self) -> float:
+        status = await apply_boost(
+            http_client=self.http_client,
+            boost_id='BoostFullAvailableTaps',
+        )
+        if status is True:
+            logger.success(f"{self.session_name} | Успешно применён буст энергии")
+
+            # Иначе следующий тап считает энергию по профилю до буста
+            self.energy.refill(now=time())
+            self.available_energy = self.energy.max_taps or self.available_energy
+
+            return self._next(self._tap, 1)
+
+        return await self._sleep_until_energy()
+
+    async def _sleep_until_energy(self) -> float:
+        if settings.USE_ENERGY_MODEL is True and self.energy.is_known:
+            return await self._sleep_until_full_energy()
+
+        return await self._sleep_by_min_energy()
+
+    async def _sleep_until_full_energy(self) -> float:
+        # Возвращаем соединения в общий пул на время сна
+        await self.http_client.close()
+
+        sleep_time = int(min(self.energy.time_until_full(), settings.SLEEP_BY_MIN_ENERGY[1]))
+        sleep_time += randint(
+            a=settings.SLEEP_BETWEEN_TAP[0],
+            b=settings.SLEEP_BETWEEN_TAP[1],
+        )
+
+        logger.info("{session} | Энергия восстановится полностью, спим <y>{delay}</y> сек.",
+                    session=self.session_name, delay=Dotted(sleep_time))
+
+        # После сна обновляем профиль и карты, но токен остаётся до истечения
+        self.synced_at = 0
+        self._save_state(next_wake_at=time() + sleep_time)
+        if settings.HIBERNATE is True and sleep_time >= settings.HIBERNATE_AFTER:
+            self._hibernate()
+
+        return self._next(self._tap, sleep_time)
+
+    async def _sleep_by_min_energy(self) -> float:
+        # Возвращаем соединения в общий пул на время сна
+        await self.http_client.close()
+
+        random_sleep = randint(
+            settings.SLEEP_BY_MIN_ENERGY[0],
+            settings.SLEEP_BY_MIN_ENERGY[1],
+        )
+
+        logger.info(
+            f'{self.session_name} | Минимальная энергия достигнута: <y>{self.available_energy}</y>'
+        )
+        logger.info(
+            f'{self.session_name} | Спим {random_sleep:,} сек.'
+        )
+
+        # После сна обновляем профиль и карты, но токен остаётся до истечения
+        self.synced_at = 0
+        self._save_state(next_wake_at=time() + random_sleep)
+        if settings.HIBERNATE is True and random_sleep >= settings.HIBERNATE_AFTER:
+            self._hibernate()
+
+        return self._next(self._tap, random_sleep)
+
+    def _sleep_between_taps(self) -> float:
+        sleep_between_clicks = randint(
+            a=settings.SLEEP_BETWEEN_TAP[0],
+            b=settings.SLEEP_BETWEEN_TAP[1],
+        )
+
+        if self.active_turbo is True:
+            sleep_between_clicks = 4
+
+        if self._tap_log.verbose:
+            logger.info("Спим {delay} сек.", delay=sleep_between_clicks)
+
+        return self._next(self._tap, sleep_between_clicks)
+
+
+def add_tapper(tg_client: Client, proxy: str | None) -> asyncio.Future:
+    # Аккаунт - только запись в куче планировщика: без своей задачи на каждый
+    # аккаунт, future завершается, когда аккаунт остановлен
+    session_name = tg_client.name
+    future = scheduler.add(Tapper(tg_client=tg_client, proxy=proxy))
+
+    def on_done(future: asyncio.Future) -> None:
+        if not future.cancelled() and isinstance(future.exception(), InvalidSession):
+            logger.error(f"{session_name} | Неправильная сессия")
+
+    future.add_done_callback(on_done)
+
+    return future
 
 
 async def run_tapper(tg_client: Client, proxy: str | None):
-    try:
-        await Tapper(tg_client=tg_client).run(proxy=proxy)
-    except InvalidSession:
-        logger.error(f"{tg_client.name} | Неправильная сессия")
+    setup_logging()
+    metrics.start()
+    profiler.start()
+
+    # Клиентом дальше владеет только Tapper, который выгружает его в спячке
+    future = add_tapper(tg_client=tg_client, proxy=proxy)
+    del tg_client
+
+    await asyncio.gather(future, return_exceptions=True)
+
+
+async def run_tappers(tg_clients: list[Client], proxies: dict[str, str | None]):
+    # Запуск всех аккаунтов в одном процессе: сначала пакетно получаем данные
+    # веб-приложения, затем аккаунты сразу переходят ко входу. Лаунчер должен
+    # вызывать её (или run_supervisor при WORKERS > 0) вместо run_tapper на каждый
+    # аккаунт - иначе данные получаются по одному при первом входе
+    setup_logging()
+    metrics.start()
+    profiler.start()
+
+    await bootstrap_web_data(tg_clients=tg_clients, proxies=proxies)
+
+    futures = [
+        add_tapper(tg_client=tg_client, proxy=proxies.get(tg_client.name))
+        for tg_client in tg_clients
+    ]
+    # Клиенты переданы аккаунтам: список не должен держать их во время спячки
+    tg_clients.clear()
+
+    await asyncio.gather(*futures, return_exceptions=True)
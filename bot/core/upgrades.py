@@ -0,0 +1,353 @@
+import heapq
+from math import ceil, floor
+from random import random
+from sys import intern
+
+from bot.config import settings
+
+
+class Upgrade:
+    # Компактная карта: только поля, нужные боту, без словаря на экземпляр.
+    # Строки id и типа условия интернированы и общие для всех аккаунтов.
+    # Поддерживает доступ как к словарю ответа API (upgrade['price'])
+    __slots__ = ('id', 'level', 'price', 'profit', 'max_level', 'is_available',
+                 'is_expired', 'cooldown', 'condition')
+
+    FIELDS = {
+        'id': 'id',
+        'level': 'level',
+        'price': 'price',
+        'profitPerHourDelta': 'profit',
+        'maxLevel': 'max_level',
+        'isAvailable': 'is_available',
+        'isExpired': 'is_expired',
+        'cooldownSeconds': 'cooldown',
+        'condition': 'condition',
+    }
+
+    # Условия разных карт одного типа - один и тот же словарь
+    _conditions: dict[str, dict] = {}
+
+    def __init__(self, data: dict) -> None:
+        self.id = intern(data['id'])
+        self.level = data['level']
+        self.price = data['price']
+        self.profit = data['profitPerHourDelta']
+        self.max_level = data.get('maxLevel')
+        self.is_available = data['isAvailable']
+        self.is_expired = data['isExpired']
+        self.cooldown = data.get('cooldownSeconds')
+        self.condition = self._intern_condition(data.get('condition'))
+
+    @classmethod
+    def _intern_condition(cls, condition: dict | None) -> dict | None:
+        if not condition:
+            return None
+
+        condition_type = condition.get('_type')
+        if isinstance(condition_type, str):
+            condition_type = intern(condition_type)
+
+        interned = cls._conditions.get(condition_type)
+        if interned is None:
+            interned = cls._conditions[condition_type] = {'_type': condition_type}
+
+        return interned
+
+    def __getitem__(self, key: str):
+        value = getattr(self, self.FIELDS[key])
+        if value is None and key != 'condition':
+            raise KeyError(key)
+
+        return value
+
+    def get(self, key: str, default=None):
+        attribute = self.FIELDS.get(key)
+        if attribute is None:
+            return default
+
+        value = getattr(self, attribute)
+
+        return default if value is None else value
+
+    def matches(self, data: dict) -> bool:
+        # Сравнение с картой из ответа API без создания нового объекта
+        condition = data.get('condition')
+
+        return (
+            self.level == data['level']
+            and self.price == data['price']
+            and self.profit == data['profitPerHourDelta']
+            and self.max_level == data.get('maxLevel')
+            and self.is_available == data['isAvailable']
+            and self.is_expired == data['isExpired']
+            and self.cooldown == data.get('cooldownSeconds')
+            and (self.condition or {}).get('_type') == (condition or {}).get('_type')
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            key: value
+            for key, attribute in self.FIELDS.items()
+            if (value := getattr(self, attribute)) is not None
+        }
+
+
+def is_upgrade_available(data: dict | Upgrade) -> bool:
+    return (
+        data['isAvailable'] is True
+        and data['isExpired'] is False
+        and data.get('cooldownSeconds', 0) == 0
+        and data.get('maxLevel', data['level']) >= data['level']
+        and (
+            data.get('condition') is None
+            or data['condition'].get('_type') != 'SubscribeTelegramChannel'
+        )
+    )
+
+
+def is_upgrade_profitable(data: dict | Upgrade) -> bool:
+    return (
+        is_upgrade_available(data)
+        and data['level'] <= settings.MAX_LEVEL
+        and data['profitPerHourDelta'] > 0
+        and data['price'] < settings.MAX_UPGRADE_PRICE
+    )
+
+
+class LevelCurves:
+    # Рост цены и прибыли карты при повышении уровня. Кривые общие для всех
+    # аккаунтов и уточняются по наблюдаемым переходам уровня
+    DEFAULT_PRICE_GROWTH = 1.05
+    DEFAULT_PROFIT_GROWTH = 1.03
+
+    def __init__(self) -> None:
+        self._growth: dict[str, tuple[float, float]] = {}
+
+    def observe(self, previous: Upgrade, current: Upgrade) -> None:
+        if current.level != previous.level + 1:
+            return
+        if previous.price <= 0 or previous.profit <= 0:
+            return
+
+        self._growth[current.id] = (
+            current.price / previous.price,
+            current.profit / previous.profit,
+        )
+
+    def growth(self, upgrade_id: str) -> tuple[float, float]:
+        return self._growth.get(upgrade_id, (self.DEFAULT_PRICE_GROWTH, self.DEFAULT_PROFIT_GROWTH))
+
+    def reset(self) -> None:
+        self._growth.clear()
+
+
+level_curves = LevelCurves()
+
+
+class _Node:
+    # Узел декартова дерева: ключ (цена, id), в best хранится лучшая
+    # по значимости карта в поддереве
+    __slots__ = ('key', 'priority', 'upgrade', 'significance', 'left', 'right', 'best')
+
+    def __init__(self, upgrade: Upgrade) -> None:
+        self.key = (upgrade.price, upgrade.id)
+        self.priority = random()
+        self.upgrade = upgrade
+        self.significance = upgrade.profit / max(upgrade.price, 1)
+        self.left = None
+        self.right = None
+        self.best = self
+
+
+def _better(first: _Node | None, second: _Node | None) -> _Node | None:
+    if first is None:
+        return second
+    if second is None:
+        return first
+
+    if first.significance != second.significance:
+        return first if first.significance > second.significance else second
+
+    return first if first.key[1] <= second.key[1] else second
+
+
+def _pull(node: _Node) -> _Node:
+    best = node
+    if node.left is not None:
+        best = _better(best, node.left.best)
+    if node.right is not None:
+        best = _better(best, node.right.best)
+
+    node.best = best
+
+    return node
+
+
+def _split(node: _Node | None, key: tuple) -> tuple[_Node | None, _Node | None]:
+    if node is None:
+        return None, None
+
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return _pull(node), right
+
+    left, node.left = _split(node.left, key)
+    return left, _pull(node)
+
+
+def _merge(left: _Node | None, right: _Node | None) -> _Node | None:
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _pull(left)
+
+    right.left = _merge(left, right.left)
+    return _pull(right)
+
+
+class UpgradeIndex:
+    # Постоянный индекс карт аккаунта. Обновляется по месту из списка
+    # upgradesForBuy (пересчитываются только изменившиеся карты), а лучшая
+    # доступная по бюджету карта ищется за O(log n)
+    def __init__(self, upgrades: list[dict] | None = None) -> None:
+        self._root = None
+        self._upgrades: dict[str, Upgrade] = {}
+        self._nodes: dict[str, _Node] = {}
+
+        if upgrades:
+            self.update(upgrades)
+
+    def __len__(self) -> int:
+        return len(self._upgrades)
+
+    def __iter__(self):
+        return iter(self._upgrades.values())
+
+    def get(self, upgrade_id: str) -> Upgrade | None:
+        return self._upgrades.get(upgrade_id)
+
+    def to_dicts(self) -> list[dict]:
+        return [upgrade.to_dict() for upgrade in self._upgrades.values()]
+
+    def update(self, upgrades: list[dict]) -> None:
+        seen = set()
+
+        for data in upgrades:
+            previous = self._upgrades.get(data['id'])
+            if previous is not None and previous.matches(data):
+                seen.add(previous.id)
+                continue
+
+            upgrade = Upgrade(data=data)
+            seen.add(upgrade.id)
+
+            if previous is not None:
+                level_curves.observe(previous=previous, current=upgrade)
+
+            self._upgrades[upgrade.id] = upgrade
+            self._reindex(upgrade_id=upgrade.id)
+
+        for upgrade_id in [upgrade_id for upgrade_id in self._upgrades if upgrade_id not in seen]:
+            del self._upgrades[upgrade_id]
+            self._reindex(upgrade_id=upgrade_id)
+
+    def _reindex(self, upgrade_id: str) -> None:
+        node = self._nodes.pop(upgrade_id, None)
+        if node is not None:
+            left, rest = _split(self._root, node.key)
+            _, right = _split(rest, (node.key[0], node.key[1] + '\0'))
+            self._root = _merge(left, right)
+
+        upgrade = self._upgrades.get(upgrade_id)
+        if upgrade is None or not is_upgrade_profitable(upgrade):
+            return
+
+        node = _Node(upgrade=upgrade)
+        self._nodes[upgrade_id] = node
+
+        left, right = _split(self._root, node.key)
+        self._root = _merge(_merge(left, node), right)
+
+    @staticmethod
+    def max_price(balance: int, earn_on_hour: float) -> int:
+        free_money = balance - settings.BALANCE_TO_SAVE
+        max_price_limit = earn_on_hour * 5
+
+        # Цены целые: "price <= free_money * 0.7" и "price < max_price_limit"
+        return min(floor(free_money * 0.7), ceil(max_price_limit) - 1)
+
+    def best(self, max_price: int) -> Upgrade | None:
+        best = None
+        node = self._root
+
+        while node is not None:
+            if node.key[0] <= max_price:
+                best = _better(best, node)
+                if node.left is not None:
+                    best = _better(best, node.left.best)
+                node = node.right
+            else:
+                node = node.left
+
+        return best.upgrade if best is not None else None
+
+    def select_batch(self, budget: int, max_price: int, count: int,
+                     candidates_limit: int = 64, resolution: int = 200) -> list[Upgrade]:
+        # Рюкзак по оставшемуся бюджету: до count карт с максимальной суммарной
+        # прибылью. Цены масштабируются до resolution шагов с округлением вверх,
+        # а ёмкость - вниз, поэтому найденный набор всегда укладывается в бюджет
+        max_price = min(max_price, budget)
+        if count <= 0 or max_price <= 0:
+            return []
+
+        nodes = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.key[0] <= max_price:
+                nodes.append(node)
+                if node.right is not None:
+                    stack.append(node.right)
+            if node.left is not None:
+                stack.append(node.left)
+
+        nodes = heapq.nlargest(candidates_limit, nodes, key=lambda item: (item.significance, item.key))
+
+        # При бюджете меньше resolution шаг - одна монета, и ёмкость равна бюджету
+        unit = max(budget / resolution, 1)
+        capacity = min(floor(budget / unit), resolution)
+        weights = [min(ceil(node.key[0] / unit), capacity + 1) for node in nodes]
+
+        # table[k][w] - (прибыль, выбранные карты) для k карт общим весом w
+        table = [[None] * (capacity + 1) for _ in range(count + 1)]
+        table[0][0] = (0, ())
+
+        for index, node in enumerate(nodes):
+            weight = weights[index]
+            profit = node.upgrade.profit
+
+            for taken in range(count, 0, -1):
+                previous_row = table[taken - 1]
+                row = table[taken]
+                for total in range(capacity, weight - 1, -1):
+                    previous = previous_row[total - weight]
+                    if previous is None:
+                        continue
+
+                    candidate = previous[0] + profit
+                    if row[total] is None or row[total][0] < candidate:
+                        row[total] = (candidate, previous[1] + (index,))
+
+        best = max(
+            (cell for row in table for cell in row if cell is not None),
+            key=lambda cell: cell[0],
+        )
+
+        chosen = sorted((nodes[index] for index in best[1]), key=lambda item: (-item.significance, item.key[1]))
+
+        return [node.upgrade for node in chosen]
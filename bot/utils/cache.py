@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from functools import lru_cache
+from time import time
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qs
+
+from bot.config import settings
+from bot.utils.logger import logger
+from bot.utils.scripts import decode_cipher
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class SharedCache:
+    # Общий для всех аккаунтов кэш глобальных данных (nuxt билд, комбо карты).
+    # Одновременные запросы одного ключа ждут единственную загрузку (single-flight),
+    # а снимок на диске спасает от лавины запросов после перезапуска.
+    # Изменения пишутся на диск пачкой не чаще раза в SHARED_CACHE_SAVE_DELAY
+    # секунд и сливаются с файлом, который могут писать другие воркеры.
+    # private - файл доступен только владельцу (в нём данные для входа)
+    def __init__(self, path: str | None = None, private: bool = False) -> None:
+        self.path = path
+        self.private = private
+        self._values: dict[str, tuple[float, Any]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._loaded = False
+
+        # Ключи, изменённые и удалённые этим процессом с прошлого сохранения
+        self._changed: set[str] = set()
+        self._deleted: set[str] = set()
+        self._save_handle: asyncio.TimerHandle | None = None
+
+    def get(self, key: str) -> Any:
+        self._load()
+
+        entry = self._values.get(key)
+        if entry is None or entry[0] <= time():
+            return None
+
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float, save: bool = True) -> None:
+        self._load()
+
+        self._values[key] = (time() + ttl, value)
+        self._changed.add(key)
+        self._deleted.discard(key)
+
+        if save:
+            self._schedule_save()
+
+    def delete(self, key: str) -> None:
+        self._load()
+
+        if self._values.pop(key, None) is not None:
+            self._changed.discard(key)
+            self._deleted.add(key)
+            self._schedule_save()
+
+    def flush(self) -> None:
+        # Немедленное сохранение: после серии set(..., save=False) или по таймеру
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+
+        self._load()
+        self._save()
+
+    def _schedule_save(self) -> None:
+        if self._save_handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        self._save_handle = loop.call_later(settings.SHARED_CACHE_SAVE_DELAY, self.flush)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                           ttl: float | Callable[[Any], float]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            value = await fetch()
+        except Exception as error:
+            future.set_exception(error)
+            # Ошибка уже передана ожидающим, не даём asyncio ругаться на неё
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        # Пустой ответ (ошибка запроса) не кэшируем
+        if value:
+            self.set(key=key, value=value, ttl=ttl(value) if callable(ttl) else ttl)
+
+        future.set_result(value)
+
+        return value
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if self.path:
+            self._values.update(self._read())
+
+    def _read(self) -> dict[str, tuple[float, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (OSError, ValueError) as error:
+            logger.warning(f"Не удалось прочитать кэш {self.path}: {error}")
+            return {}
+
+        now = time()
+
+        return {
+            key: (expires_at, value)
+            for key, (expires_at, value) in data.items()
+            if expires_at > now
+        }
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        try:
+            # Файл могут писать несколько процессов-воркеров: под блокировкой
+            # перечитываем его и накладываем только свои изменения, чтобы
+            # не затереть чужие записи и не вернуть удалённые другим процессом
+            with open(f'{self.path}.lock', 'w') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+
+                data = self._read()
+                for key in self._deleted:
+                    data.pop(key, None)
+                for key in self._changed:
+                    entry = self._values.get(key)
+                    if entry is not None:
+                        data[key] = entry
+
+                temp_path = f'{self.path}.{os.getpid()}.tmp'
+                mode = 0o600 if self.private else 0o666
+                with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), 'w') as file:
+                    json.dump(data, file)
+                if self.private:
+                    # Временный файл мог остаться от прошлого запуска с другими правами
+                    os.chmod(temp_path, mode)
+                os.replace(temp_path, self.path)
+        except (OSError, TypeError) as error:
+            logger.warning(f"Не удалось сохранить кэш {self.path}: {error}")
+            return
+
+        self._values = data
+        self._changed.clear()
+        self._deleted.clear()
+
+
+def combo_cards_ttl(combo_cards: dict) -> float:
+    # Комбо действует с 15:00 дня из поля date до 15:00 следующего дня
+    try:
+        start_bonus_round = datetime.strptime(combo_cards['date'], "%d-%m-%y").replace(hour=15)
+    except (KeyError, TypeError, ValueError):
+        return 300
+
+    end_bonus_round = start_bonus_round + timedelta(days=1)
+    now = datetime.now()
+
+    if start_bonus_round <= now < end_bonus_round:
+        return (end_bonus_round - now).total_seconds()
+
+    # Источник ещё не обновил комбо на новый день - проверяем чаще
+    return 300
+
+
+decode_cipher_cached = lru_cache(maxsize=64)(decode_cipher)
+
+
+def web_data_ttl(tg_web_data: str) -> float:
+    # Данные веб-приложения действительны TG_WEB_DATA_TTL секунд от auth_date
+    try:
+        auth_date = float(parse_qs(tg_web_data)['auth_date'][0])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return settings.TG_WEB_DATA_TTL
+
+    return max(auth_date + settings.TG_WEB_DATA_TTL - time(), 0)
+
+
+shared_cache = SharedCache(path=settings.SHARED_CACHE_PATH)
+web_data_cache = SharedCache(path=settings.WEB_DATA_CACHE_PATH, private=True)
@@ -0,0 +1,24 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson разбирает большие ответы (upgradesForBuy) в разы быстрее и с меньшим
+# числом временных объектов; без него работаем на стандартном json
+
+if orjson is not None:
+    def loads(data: str | bytes):
+        return orjson.loads(data)
+
+    def dumps(value) -> str:
+        return orjson.dumps(value).decode()
+
+else:
+    def loads(data: str | bytes):
+        return json.loads(data)
+
+    def dumps(value) -> str:
+        return json.dumps(value, separators=(',', ':'))
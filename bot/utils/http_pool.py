@@ -0,0 +1,149 @@
+import aiohttp
+from aiohttp_proxy import ProxyConnector
+from multidict import CIMultiDict
+from yarl import URL
+
+from bot.config import settings
+from bot.utils import fast_json
+from bot.utils.metrics import metrics
+from bot.utils.proxy_manager import proxy_manager
+from bot.utils.rate_limit import rate_limiter
+
+
+class PooledClient:
+    # Клиент конкретного аккаунта: свои заголовки (User-Agent, Bearer токен),
+    # а TCP/TLS соединения берутся из общего пула для этого прокси
+    def __init__(self, pool: 'HttpPool', proxy: str | None, headers: dict[str, str]) -> None:
+        self._pool = pool
+        self.proxy = proxy
+        self.headers = CIMultiDict(headers)
+        self.closed = False
+        # Сервер ответил 401 - токен аккаунта истёк и его нужно обновить
+        self.unauthorized = False
+
+    def request(self, method: str, url, **kwargs):
+        if self.closed:
+            raise RuntimeError('Session is closed')
+
+        headers = self.headers
+        extra_headers = kwargs.pop('headers', None)
+        if extra_headers:
+            headers = CIMultiDict(headers)
+            headers.update(extra_headers)
+
+        session = self._pool.session(proxy=self.proxy)
+
+        redirect = self._pool.redirects.get(self.proxy)
+        if redirect is not None:
+            url = redirect.join(URL(url).relative())
+
+        return session.request(method, url, headers=headers, trace_request_ctx=self, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request('OPTIONS', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    async def close(self) -> None:
+        # Соединения не закрываются, а остаются в пуле для других аккаунтов
+        self.closed = True
+
+    async def __aenter__(self) -> 'PooledClient':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+class _FastJsonResponse(aiohttp.ClientResponse):
+    # response.json() в методах API по умолчанию разбирается быстрым декодером
+    async def json(self, *, encoding: str | None = None, loads=fast_json.loads,
+                   content_type: str | None = 'application/json'):
+        return await super().json(encoding=encoding, loads=loads, content_type=content_type)
+
+
+async def _on_request_end(session, context, params) -> None:
+    if params.response.status == 401 and isinstance(context.trace_request_ctx, PooledClient):
+        context.trace_request_ctx.unauthorized = True
+
+
+_auth_trace_config = aiohttp.TraceConfig()
+_auth_trace_config.on_request_end.append(_on_request_end)
+
+
+class HttpPool:
+    def __init__(self) -> None:
+        self._sessions: dict[str | None, aiohttp.ClientSession] = {}
+
+        # Подмена адреса API (например на локальный мок-сервер для бенчмарка),
+        # при этом сам прокси не используется
+        self.redirects: dict[str | None, URL] = {}
+        self.trace_configs: list[aiohttp.TraceConfig] = [
+            rate_limiter.trace_config,
+            _auth_trace_config,
+            metrics.trace_config,
+            proxy_manager.trace_config,
+        ]
+
+    def redirect(self, base_url: str, proxy: str | None = None) -> None:
+        self.redirects[proxy] = URL(base_url)
+
+    def _make_connector(self, proxy: str | None) -> aiohttp.TCPConnector:
+        options = dict(
+            limit=settings.POOL_LIMIT,
+            limit_per_host=settings.POOL_LIMIT_PER_HOST,
+            keepalive_timeout=settings.POOL_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=settings.POOL_DNS_CACHE_TTL,
+        )
+
+        if proxy and proxy not in self.redirects:
+            return ProxyConnector.from_url(proxy, **options)
+
+        return aiohttp.TCPConnector(**options)
+
+    def session(self, proxy: str | None) -> aiohttp.ClientSession:
+        session = self._sessions.get(proxy)
+
+        if session is None or session.closed:
+            # Куки не должны перетекать между аккаунтами, которые делят одну сессию
+            session = aiohttp.ClientSession(
+                connector=self._make_connector(proxy=proxy),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=self.trace_configs,
+                response_class=_FastJsonResponse,
+                json_serialize=fast_json.dumps,
+            )
+            self._sessions[proxy] = session
+
+        return session
+
+    def get_client(self, proxy: str | None, headers: dict[str, str]) -> PooledClient:
+        return PooledClient(pool=self, proxy=proxy, headers=headers)
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+
+http_pool = HttpPool()
@@ -0,0 +1,98 @@
+import json
+import sys
+
+from loguru import logger as loguru_logger
+
+from bot.config import settings
+from bot.utils.logger import logger
+
+
+class Dotted:
+    # Число с разделением тысяч через точку. Строка собирается только когда
+    # loguru действительно форматирует сообщение для принявшего его синка
+    __slots__ = ('value',)
+
+    def __init__(self, value: float) -> None:
+        self.value = value
+
+    def __format__(self, format_spec: str) -> str:
+        return f"{int(self.value):,}".replace(',', '.')
+
+    def __str__(self) -> str:
+        return self.__format__('')
+
+
+def _json_default(value):
+    if isinstance(value, Dotted):
+        return value.value
+
+    return str(value)
+
+
+def json_sink(message) -> None:
+    record = message.record
+
+    data = {
+        'time': round(record['time'].timestamp(), 3),
+        'level': record['level'].name,
+        'message': record['message'],
+    }
+    data.update(record['extra'])
+
+    sys.stdout.write(json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n')
+
+
+_configured = False
+
+
+def setup_logging(sink=None) -> None:
+    global _configured
+
+    if _configured:
+        return
+    _configured = True
+
+    if sink is not None:
+        loguru_logger.remove()
+        loguru_logger.add(sink=sink, level=settings.LOG_LEVEL, colorize=False)
+    elif settings.LOG_MODE == 'json':
+        loguru_logger.remove()
+        loguru_logger.add(sink=json_sink, level=settings.LOG_LEVEL, colorize=False)
+
+
+class TapLogAggregator:
+    # Вместо строки на каждый тап - одна сводка по аккаунту раз в LOG_TAPS_EVERY тапов
+    __slots__ = ('session_name', 'every', 'requests', 'taps', 'coins')
+
+    def __init__(self, session_name: str, every: int) -> None:
+        self.session_name = session_name
+        self.every = max(every, 1)
+        self.requests = 0
+        self.taps = 0
+        self.coins = 0
+
+    @property
+    def verbose(self) -> bool:
+        return self.every == 1
+
+    def add(self, taps: int, coins: int, balance: int, total: int) -> None:
+        if self.verbose:
+            logger.success("{session} | Успешный тап! | Баланс: <c>{balance}</c> (<g>+{coins}</g>) | Всего: <e>{total}</e>",
+                           session=self.session_name, balance=Dotted(balance), coins=Dotted(coins), total=Dotted(total))
+            return
+
+        self.requests += 1
+        self.taps += taps
+        self.coins += coins
+
+        if self.requests < self.every:
+            return
+
+        logger.success("{session} | Тапов: <m>{taps}</m> за {requests} запросов | "
+                       "Баланс: <c>{balance}</c> (<g>+{coins}</g>) | Всего: <e>{total}</e>",
+                       session=self.session_name, taps=Dotted(self.taps), requests=self.requests,
+                       balance=Dotted(balance), coins=Dotted(self.coins), total=Dotted(total))
+
+        self.requests = 0
+        self.taps = 0
+        self.coins = 0
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import os
+from bisect import bisect_left
+from time import monotonic, time
+
+import aiohttp
+from aiohttp import web
+
+from bot.config import settings
+from bot.utils.logger import logger
+
+
+# Границы корзин гистограммы задержек в секундах
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5,
+    0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, quantile: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = quantile * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+
+        return self.bounds[-1]
+
+    def merge(self, data: dict) -> None:
+        for index, count in enumerate(data['counts']):
+            self.counts[index] += count
+        self.sum += data['sum']
+        self.count += data['count']
+
+    def to_dict(self) -> dict:
+        return {'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class Metrics:
+    # Дешёвые числовые счётчики без форматирования строк на горячем пути;
+    # задержка каждого запроса к API снимается через TraceConfig пула соединений
+    def __init__(self) -> None:
+        self.latency: dict[str, Histogram] = {}
+        self.errors: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+        self.coins: dict[str, float] = {}
+        self.taps: dict[str, int] = {}
+        self.earn_on_hour: dict[str, float] = {}
+        self.stages: dict[str, Histogram] = {}
+        self.started = time()
+
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_request_end.append(self._on_request_end)
+        self.trace_config.on_request_exception.append(self._on_request_exception)
+
+        self._tasks: list[asyncio.Task] = []
+
+    def reset(self) -> None:
+        self.latency.clear()
+        self.errors.clear()
+        self.retries.clear()
+        self.coins.clear()
+        self.taps.clear()
+        self.earn_on_hour.clear()
+        self.stages.clear()
+        self.started = time()
+
+    async def _on_request_start(self, session, context, params) -> None:
+        context.start = monotonic()
+
+    async def _on_request_end(self, session, context, params) -> None:
+        self.observe_request(
+            endpoint=params.url.path,
+            duration=monotonic() - context.start,
+            error=params.response.status >= 400,
+        )
+
+    async def _on_request_exception(self, session, context, params) -> None:
+        # Запрос мог быть отклонён ещё до отправки (лимитер, выключатель)
+        if not hasattr(context, 'start'):
+            return
+
+        self.observe_request(
+            endpoint=params.url.path,
+            duration=monotonic() - context.start,
+            error=True,
+        )
+
+    def observe_request(self, endpoint: str, duration: float, error: bool = False) -> None:
+        histogram = self.latency.get(endpoint)
+        if histogram is None:
+            histogram = self.latency[endpoint] = Histogram()
+        histogram.observe(duration)
+
+        if error:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def observe_stage(self, stage: str, duration: float) -> None:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.observe(duration)
+
+    def record_retry(self, stage: str) -> None:
+        self.retries[stage] = self.retries.get(stage, 0) + 1
+
+    def record_taps(self, session_name: str, taps: int, coins: float) -> None:
+        self.taps[session_name] = self.taps.get(session_name, 0) + taps
+        self.coins[session_name] = self.coins.get(session_name, 0) + coins
+
+    def set_earn_on_hour(self, session_name: str, earn_on_hour: float) -> None:
+        self.earn_on_hour[session_name] = earn_on_hour
+
+    def snapshot(self) -> dict:
+        return {
+            'timestamp': time(),
+            'uptime': time() - self.started,
+            'latency': {endpoint: histogram.to_dict() for endpoint, histogram in self.latency.items()},
+            'errors': dict(self.errors),
+            'retries': dict(self.retries),
+            'coins': dict(self.coins),
+            'taps': dict(self.taps),
+            'earn_on_hour': dict(self.earn_on_hour),
+            'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+        }
+
+    def merge(self, snapshot: dict) -> None:
+        for endpoint, data in snapshot['latency'].items():
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram()
+            histogram.merge(data=data)
+
+        for stage, data in snapshot.get('stages', {}).items():
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.merge(data=data)
+
+        for name in ('errors', 'retries', 'coins', 'taps'):
+            target = getattr(self, name)
+            for key, value in snapshot[name].items():
+                target[key] = target.get(key, 0) + value
+
+        self.earn_on_hour.update(snapshot['earn_on_hour'])
+
+    def render_prometheus(self) -> str:
+        lines = []
+
+        histograms = (
+            ('hamster_request_duration_seconds', 'endpoint', self.latency),
+            ('hamster_stage_duration_seconds', 'stage', self.stages),
+        )
+        for name, label, values in histograms:
+            lines.append(f'# TYPE {name} histogram')
+            for key, histogram in sorted(values.items()):
+                cumulative = 0
+                for index, bound in enumerate(histogram.bounds):
+                    cumulative += histogram.counts[index]
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+
+        series = (
+            ('hamster_request_errors_total', 'counter', 'endpoint', self.errors),
+            ('hamster_retries_total', 'counter', 'stage', self.retries),
+            ('hamster_account_taps_total', 'counter', 'account', self.taps),
+            ('hamster_account_coins_total', 'counter', 'account', self.coins),
+            ('hamster_account_earn_per_hour', 'gauge', 'account', self.earn_on_hour),
+        )
+        for name, kind, label, values in series:
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in sorted(values.items()):
+                lines.append(f'{name}{{{label}="{key}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+
+        loop = asyncio.get_running_loop()
+
+        if settings.METRICS_PORT:
+            self._tasks.append(loop.create_task(self._serve(port=settings.METRICS_PORT)))
+
+        if settings.METRICS_JSON_PATH:
+            self._tasks.append(loop.create_task(self._dump(
+                path=settings.METRICS_JSON_PATH,
+                interval=settings.METRICS_DUMP_INTERVAL,
+            )))
+
+    async def _serve(self, port: int) -> None:
+        async def handler(request: web.Request) -> web.Response:
+            return web.Response(text=self.render_prometheus(), content_type='text/plain')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handler)
+
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host=settings.METRICS_HOST, port=port).start()
+
+        logger.info(f"Метрики доступны на <y>http://{settings.METRICS_HOST}:{port}/metrics</y>")
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def _dump(self, path: str, interval: int) -> None:
+        while True:
+            await asyncio.sleep(delay=interval)
+
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump(self.snapshot(), file)
+            os.replace(f'{path}.tmp', path)
+
+
+metrics = Metrics()
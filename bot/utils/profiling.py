@@ -0,0 +1,261 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from time import monotonic
+
+from bot.config import settings
+from bot.core.scheduler import scheduler
+from bot.utils.logger import logger
+from bot.utils.metrics import Histogram, metrics
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename.replace('\\', '/').rsplit('/', 2)
+
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    # Семплирующий профайлер потока цикла событий: фоновый поток каждые
+    # interval секунд снимает стек и считает одинаковые стеки. Результат -
+    # "свёрнутые" стеки (folded) для flamegraph.pl / speedscope / inferno
+    def __init__(self) -> None:
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+
+        self._target: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float) -> None:
+        if self.running:
+            return
+
+        self.stacks.clear()
+        self.samples = 0
+        self.started_at = monotonic()
+
+        # Профилируется поток, из которого запущен профайлер (поток цикла событий)
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, args=(interval,), name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self, directory: str) -> str | None:
+        if not self.running:
+            return None
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S-%f}.folded")
+
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+        return path
+
+    def _sample(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+
+class SlowCallbackDetector:
+    # Замеряет каждый колбэк цикла событий (asyncio Handle) и логирует те,
+    # что держат цикл дольше порога - без отладочного режима asyncio
+    def __init__(self) -> None:
+        self.threshold = 0.0
+        self.count = 0
+        self._original = None
+
+    def install(self, threshold: float) -> None:
+        if self._original is not None:
+            return
+
+        self.threshold = threshold
+        self._original = original = asyncio.events.Handle._run
+        detector = self
+
+        def _run(handle) -> None:
+            started = monotonic()
+            original(handle)
+            duration = monotonic() - started
+
+            if duration >= detector.threshold:
+                detector.report(handle=handle, duration=duration)
+
+        asyncio.events.Handle._run = _run
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            asyncio.events.Handle._run = self._original
+            self._original = None
+
+    @staticmethod
+    def describe(handle) -> str:
+        # Почти все колбэки - шаги задач (Task.__step / task_wakeup), repr которых
+        # не называет корутину: показываем корутину, имя задачи и этап Tapper
+        task = getattr(handle._callback, '__self__', None)
+        if not isinstance(task, asyncio.Task):
+            return repr(handle)
+
+        coro = task.get_coro()
+        description = f"{getattr(coro, '__qualname__', coro)} ({task.get_name()})"
+
+        job = scheduler.running(task)
+        if getattr(job, 'stage', None) is not None:
+            description += f" | {job.session_name} | этап {job.stage}"
+
+        return description
+
+    def report(self, handle, duration: float) -> None:
+        self.count += 1
+        metrics.observe_stage(stage='slow_callback', duration=duration)
+        logger.warning(f"Цикл событий заблокирован на <r>{duration * 1000:.0f}</r> мс: {self.describe(handle)}")
+
+
+class Profiler:
+    # Точки профилирования процесса: p99 этапов Tapper в логе, детектор медленных
+    # колбэков и семплирующий профайлер, который включается сигналом SIGUSR2
+    # или командой в локальный сокет (start / stop / toggle / status)
+    def __init__(self) -> None:
+        self.sampler = SamplingProfiler()
+        self.slow_callbacks = SlowCallbackDetector()
+
+        self._tasks: list[asyncio.Task] = []
+        self._previous: dict[str, list[int]] = {}
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+
+        loop = asyncio.get_running_loop()
+
+        if settings.SLOW_CALLBACK_MS > 0:
+            self.slow_callbacks.install(threshold=settings.SLOW_CALLBACK_MS / 1000)
+
+        if settings.PROFILE_LOG_INTERVAL > 0:
+            self._tasks.append(loop.create_task(self._log_stages(interval=settings.PROFILE_LOG_INTERVAL)))
+
+        if settings.PROFILER_PORT:
+            self._tasks.append(loop.create_task(self._serve(port=settings.PROFILER_PORT)))
+
+        if hasattr(signal, 'SIGUSR2'):
+            try:
+                loop.add_signal_handler(signal.SIGUSR2, lambda: logger.info(self.toggle()))
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+    def stop(self) -> None:
+        # Возвращаем исходный Handle._run и останавливаем фоновые задачи
+        self.slow_callbacks.uninstall()
+
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+        if self.sampler.running:
+            logger.info(self.stop_sampling())
+
+    def toggle(self) -> str:
+        return self.stop_sampling() if self.sampler.running else self.start_sampling()
+
+    def start_sampling(self) -> str:
+        if self.sampler.running:
+            return 'Профайлер уже запущен'
+
+        self.sampler.start(interval=settings.PROFILER_INTERVAL_MS / 1000)
+
+        return f'Профайлер запущен (процесс {os.getpid()})'
+
+    def stop_sampling(self) -> str:
+        if not self.sampler.running:
+            return 'Профайлер не запущен'
+
+        samples = self.sampler.samples
+        elapsed = monotonic() - self.sampler.started_at
+        path = self.sampler.stop(directory=settings.PROFILER_PATH)
+
+        return f'Профайлер остановлен: {samples} семплов за {elapsed:.1f} сек. записаны в {path}'
+
+    def status(self) -> str:
+        if not self.sampler.running:
+            return 'Профайлер не запущен'
+
+        return f'Профайлер запущен: {self.sampler.samples} семплов за {monotonic() - self.sampler.started_at:.1f} сек.'
+
+    async def _serve(self, port: int) -> None:
+        commands = {
+            'start': self.start_sampling,
+            'stop': self.stop_sampling,
+            'toggle': self.toggle,
+            'status': self.status,
+        }
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                while line := await reader.readline():
+                    command = commands.get(line.decode(errors='ignore').strip().lower())
+                    answer = command() if command else f"Команды: {', '.join(commands)}"
+
+                    writer.write(f'{answer}\n'.encode())
+                    await writer.drain()
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host='127.0.0.1', port=port)
+        logger.info(f"Управление профайлером: <y>127.0.0.1:{port}</y> (start / stop / toggle / status)")
+
+        async with server:
+            await server.serve_forever()
+
+    def _window(self, stage: str, histogram: Histogram) -> Histogram:
+        # Только запросы с прошлого вывода, чтобы регрессия была видна сразу
+        previous = self._previous.get(stage) or [0] * len(histogram.counts)
+        self._previous[stage] = list(histogram.counts)
+
+        window = Histogram(bounds=histogram.bounds)
+        window.counts = [max(count - before, 0) for count, before in zip(histogram.counts, previous)]
+        window.count = sum(window.counts)
+
+        return window
+
+    async def _log_stages(self, interval: int) -> None:
+        while True:
+            await asyncio.sleep(delay=interval)
+
+            parts = []
+            for stage, histogram in sorted(metrics.stages.items()):
+                window = self._window(stage=stage, histogram=histogram)
+                if window.count:
+                    parts.append(f"{stage} p50 {window.quantile(0.5) * 1000:.0f} / "
+                                 f"p99 <y>{window.quantile(0.99) * 1000:.0f}</y> мс ({window.count})")
+
+            if parts:
+                logger.info(f"Этапы за {interval} сек.: {' | '.join(parts)}")
+
+
+profiler = Profiler()
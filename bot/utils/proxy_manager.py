@@ -0,0 +1,182 @@
+from math import ceil
+from time import monotonic
+
+import aiohttp
+
+from bot.config import settings
+from bot.utils.logger import logger
+from bot.utils.rate_limit import classify_exception, classify_status
+
+
+class ProxyStats:
+    # Скользящие (EWMA) задержка и доля ошибок прокси по настоящим запросам к API
+    __slots__ = ('latency', 'error_rate', 'samples')
+
+    ALPHA = 0.1
+
+    def __init__(self) -> None:
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.samples = 0
+
+    def observe(self, latency: float | None, error: bool) -> None:
+        alpha = max(self.ALPHA, 1 / (self.samples + 1))
+
+        if latency is not None:
+            self.latency += alpha * (latency - self.latency)
+        self.error_rate += alpha * ((1.0 if error else 0.0) - self.error_rate)
+        self.samples += 1
+
+    @property
+    def score(self) -> float:
+        # Ожидаемое время одного успешного запроса, меньше - лучше
+        return self.latency / max(1 - self.error_rate, 0.05)
+
+
+class ProxyManager:
+    # Оценивает прокси по задержке и ошибкам реального трафика и переводит
+    # аккаунты с деградировавших прокси на лучшие. Аккаунт остаётся на прокси
+    # не меньше PROXY_STICKY_SECONDS, а переход нужен только при заметном отрыве
+    def __init__(self) -> None:
+        self.stats: dict[str, ProxyStats] = {}
+        self.assignments: dict[str, str] = {}
+        self.assigned_at: dict[str, float] = {}
+        self.loads: dict[str, int] = {}
+        self.switches = 0
+
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_request_end.append(self._on_request_end)
+        self.trace_config.on_request_exception.append(self._on_request_exception)
+
+    def reset(self) -> None:
+        self.stats.clear()
+        self.assignments.clear()
+        self.assigned_at.clear()
+        self.loads.clear()
+        self.switches = 0
+
+    def register(self, session_name: str, proxy: str | None) -> None:
+        if not proxy:
+            return
+
+        self.stats.setdefault(proxy, ProxyStats())
+        self._assign(session_name=session_name, proxy=proxy)
+
+    def _assign(self, session_name: str, proxy: str) -> None:
+        previous = self.assignments.get(session_name)
+        if previous is not None:
+            self.loads[previous] -= 1
+
+        self.assignments[session_name] = proxy
+        self.assigned_at[session_name] = monotonic()
+        self.loads[proxy] = self.loads.get(proxy, 0) + 1
+
+    def observe(self, proxy: str | None, latency: float | None, error: bool) -> None:
+        stats = self.stats.get(proxy)
+        if stats is not None:
+            stats.observe(latency=latency, error=error)
+
+    def load(self, proxy: str) -> int:
+        return self.loads.get(proxy, 0)
+
+    def capacity(self) -> int:
+        if settings.PROXY_MAX_ACCOUNTS > 0:
+            return settings.PROXY_MAX_ACCOUNTS
+
+        # Без явного лимита - не больше удвоенной средней нагрузки
+        return ceil(len(self.assignments) / max(len(self.stats), 1) * 2)
+
+    def is_degraded(self, proxy: str) -> bool:
+        stats = self.stats.get(proxy)
+        if stats is None or stats.samples < settings.PROXY_MIN_SAMPLES:
+            return False
+
+        if stats.error_rate > settings.PROXY_MAX_ERROR_RATE:
+            return True
+
+        best = self._best(exclude=proxy)
+        return best is not None and stats.score > self.stats[best].score * settings.PROXY_SWITCH_FACTOR
+
+    def _best(self, exclude: str | None = None) -> str | None:
+        capacity = self.capacity()
+        candidates = [
+            proxy for proxy, stats in self.stats.items()
+            if proxy != exclude
+            and stats.samples >= settings.PROXY_MIN_SAMPLES
+            and stats.error_rate <= settings.PROXY_MAX_ERROR_RATE
+            and self.load(proxy) < capacity
+        ]
+        if not candidates:
+            return None
+
+        # Загруженные прокси штрафуются, чтобы аккаунты не сбегались на один лучший
+        return min(candidates, key=lambda proxy: self.stats[proxy].score * (1 + self.load(proxy) / capacity))
+
+    def reassign(self, session_name: str, proxy: str | None, force: bool = False) -> str | None:
+        # Возвращает прокси, на котором аккаунту работать дальше. force - прокси
+        # недоступен (выключатель открыт), ждать окончания закрепления не нужно
+        if not settings.PROXY_REASSIGN or not proxy or session_name not in self.assignments:
+            return proxy
+
+        if not force and monotonic() - self.assigned_at[session_name] < settings.PROXY_STICKY_SECONDS:
+            return proxy
+
+        if not force and not self.is_degraded(proxy):
+            return proxy
+
+        best = self._best(exclude=proxy)
+        if best is None:
+            return proxy
+
+        stats = self.stats[proxy]
+        logger.info(f"{session_name} | Прокси <r>{proxy}</r> деградировал "
+                    f"(задержка {stats.latency * 1000:.0f} мс, ошибок {stats.error_rate:.0%}), "
+                    f"переключаемся на <g>{best}</g>")
+
+        self._assign(session_name=session_name, proxy=best)
+        self.switches += 1
+
+        return best
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            proxy: {
+                'latency': stats.latency,
+                'error_rate': stats.error_rate,
+                'samples': stats.samples,
+                'score': stats.score,
+                'accounts': self.load(proxy),
+            }
+            for proxy, stats in self.stats.items()
+        }
+
+    @staticmethod
+    def _proxy(context) -> str | None:
+        return getattr(context.trace_request_ctx, 'proxy', None)
+
+    async def _on_request_start(self, session, context, params) -> None:
+        context.proxy_started = monotonic()
+
+    async def _on_request_end(self, session, context, params) -> None:
+        self.observe(
+            proxy=self._proxy(context),
+            latency=monotonic() - context.proxy_started,
+            error=classify_status(status=params.response.status) is not None,
+        )
+
+    async def _on_request_exception(self, session, context, params) -> None:
+        if not hasattr(context, 'proxy_started'):
+            return
+
+        failure = classify_exception(error=params.exception)
+        if failure is None:
+            return
+
+        # Таймаут - тоже задержка прокси, обрыв соединения - только ошибка
+        latency = monotonic() - context.proxy_started if failure == 'timeout' else None
+
+        self.observe(proxy=self._proxy(context), latency=latency, error=True)
+
+
+proxy_manager = ProxyManager()
@@ -0,0 +1,219 @@
+import asyncio
+from random import uniform
+from time import monotonic
+
+import aiohttp
+
+from bot.config import settings
+from bot.utils.logger import logger
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f'Circuit for {name} is open, retry in {retry_after:.0f}s')
+        self.name = name
+        self.retry_after = retry_after
+
+
+def classify_status(status: int) -> str | None:
+    if status == 429:
+        return 'throttled'
+    if status >= 500:
+        return 'server'
+
+    return None
+
+
+def classify_exception(error: BaseException) -> str | None:
+    if isinstance(error, CircuitOpenError):
+        return None
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ServerTimeoutError)):
+        return 'timeout'
+    if isinstance(error, aiohttp.ClientResponseError):
+        return classify_status(status=error.status)
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return 'connection'
+
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    # Экспоненциальная задержка с джиттером, чтобы аккаунты не повторяли запросы синхронно
+    delay = min(settings.BACKOFF_BASE * 2 ** max(attempt - 1, 0), settings.BACKOFF_MAX)
+
+    return delay / 2 + uniform(0, delay / 2)
+
+
+class TokenBucket:
+    # Адаптивный лимит: при 429/5xx скорость уменьшается вдвое, при успехах
+    # постепенно возвращается к настроенной
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+
+    def reserve(self) -> float:
+        if self.max_rate <= 0:
+            return 0
+
+        now = monotonic()
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.capacity)
+        self.updated = now
+
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+
+        return -self.tokens / self.rate
+
+    def on_throttle(self) -> None:
+        self.rate = max(self.rate / 2, self.max_rate / 20)
+
+    def on_success(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.rate + self.max_rate / 100, self.max_rate)
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def retry_after(self) -> float:
+        if not self.opened_at:
+            return 0
+
+        # После паузы пропускаем пробные запросы (half-open)
+        return max(self.opened_at + self.cooldown - monotonic(), 0)
+
+    def record_success(self) -> None:
+        if self.opened_at:
+            logger.info(f"{self.name} | Работа восстановлена")
+
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures < self.threshold:
+            return
+
+        if not self.opened_at or not self.retry_after():
+            logger.warning(f"{self.name} | Слишком много ошибок подряд, пауза <y>{self.cooldown}</y> сек.")
+
+        self.opened_at = monotonic()
+
+
+class RateLimiter:
+    # Глобальный и попроксийный бюджет запросов и автоматические выключатели
+    # для прокси и методов API. Подключается к пулу соединений через TraceConfig.
+    # Запросы без прокси ограничивает только глобальный бюджет
+    def __init__(self) -> None:
+        self.global_bucket = TokenBucket(rate=settings.RATE_LIMIT_GLOBAL)
+        self.proxy_buckets: dict[str, TokenBucket] = {}
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_request_end.append(self._on_request_end)
+        self.trace_config.on_request_exception.append(self._on_request_exception)
+
+    def reset(self) -> None:
+        self.global_bucket = TokenBucket(rate=settings.RATE_LIMIT_GLOBAL)
+        self.proxy_buckets.clear()
+        self.breakers.clear()
+
+    def _proxy_bucket(self, proxy: str | None) -> TokenBucket | None:
+        if not proxy:
+            return None
+
+        bucket = self.proxy_buckets.get(proxy)
+        if bucket is None:
+            bucket = self.proxy_buckets[proxy] = TokenBucket(rate=settings.RATE_LIMIT_PER_PROXY)
+
+        return bucket
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(
+                name=name,
+                threshold=settings.BREAKER_THRESHOLD,
+                cooldown=settings.BREAKER_COOLDOWN,
+            )
+
+        return breaker
+
+    def _breaker_names(self, proxy: str | None, endpoint: str) -> tuple[str, str]:
+        return f'proxy {proxy or "direct"}', f'endpoint {endpoint}'
+
+    def retry_after(self, proxy: str | None, endpoint: str) -> tuple[str, float]:
+        for name in self._breaker_names(proxy=proxy, endpoint=endpoint):
+            breaker = self.breakers.get(name)
+            if breaker is not None:
+                retry_after = breaker.retry_after()
+                if retry_after:
+                    return name, retry_after
+
+        return '', 0
+
+    async def acquire(self, proxy: str | None, endpoint: str) -> None:
+        name, retry_after = self.retry_after(proxy=proxy, endpoint=endpoint)
+        if retry_after:
+            raise CircuitOpenError(name=name, retry_after=retry_after)
+
+        delay = self.global_bucket.reserve()
+
+        proxy_bucket = self._proxy_bucket(proxy=proxy)
+        if proxy_bucket is not None:
+            delay = max(delay, proxy_bucket.reserve())
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, proxy: str | None, endpoint: str, failure: str | None) -> None:
+        breakers = [self._breaker(name=name) for name in self._breaker_names(proxy=proxy, endpoint=endpoint)]
+        buckets = [bucket for bucket in (self.global_bucket, self._proxy_bucket(proxy=proxy)) if bucket is not None]
+
+        if failure is None:
+            for breaker in breakers:
+                breaker.record_success()
+            for bucket in buckets:
+                bucket.on_success()
+            return
+
+        for breaker in breakers:
+            breaker.record_failure()
+
+        if failure in ('throttled', 'server'):
+            for bucket in buckets:
+                bucket.on_throttle()
+
+    @staticmethod
+    def _proxy(context) -> str | None:
+        return getattr(context.trace_request_ctx, 'proxy', None)
+
+    async def _on_request_start(self, session, context, params) -> None:
+        await self.acquire(proxy=self._proxy(context), endpoint=params.url.path)
+
+    async def _on_request_end(self, session, context, params) -> None:
+        self.record(
+            proxy=self._proxy(context),
+            endpoint=params.url.path,
+            failure=classify_status(status=params.response.status),
+        )
+
+    async def _on_request_exception(self, session, context, params) -> None:
+        failure = classify_exception(error=params.exception)
+        if failure is None:
+            return
+
+        self.record(proxy=self._proxy(context), endpoint=params.url.path, failure=failure)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+from time import time
+
+from bot.config import settings
+from bot.utils import fast_json
+
+
+class StateStore:
+    # Состояние аккаунтов между перезапусками: токен и время его получения,
+    # заголовки (User-Agent), последний профиль, список карт, собранные
+    # ежедневные награды и время следующего пробуждения
+    COLUMNS = {
+        'access_token': 'TEXT',
+        'token_created_at': 'REAL',
+        'profile': 'TEXT',
+        'upgrades': 'TEXT',
+        'next_wake_at': 'REAL',
+        'daily_claims': 'TEXT',
+        'headers': 'TEXT',
+    }
+    JSON_COLUMNS = {'profile', 'upgrades', 'daily_claims', 'headers'}
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # В базе токены доступа: файл (и журналы WAL, которые SQLite создаёт
+        # с теми же правами) доступен только владельцу
+        os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))
+        os.chmod(self.path, 0o600)
+
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS accounts ('
+            'session_name TEXT PRIMARY KEY, updated_at REAL)'
+        )
+
+        existing = {row[1] for row in connection.execute('PRAGMA table_info(accounts)')}
+        for column, kind in self.COLUMNS.items():
+            if column not in existing:
+                connection.execute(f'ALTER TABLE accounts ADD COLUMN {column} {kind}')
+
+        self._connection = connection
+
+        return connection
+
+    def load(self, session_name: str) -> dict | None:
+        connection = self._connect()
+
+        columns = list(self.COLUMNS)
+        row = connection.execute(
+            f"SELECT {', '.join(columns)} FROM accounts WHERE session_name = ?",
+            (session_name,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        state = dict(zip(columns, row))
+        for column in self.JSON_COLUMNS:
+            if state[column] is not None:
+                state[column] = fast_json.loads(state[column])
+
+        return state
+
+    def save(self, session_name: str, **fields) -> None:
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f'Unknown state fields: {", ".join(sorted(unknown))}')
+
+        values = {
+            column: fast_json.dumps(value) if column in self.JSON_COLUMNS and value is not None else value
+            for column, value in fields.items()
+        }
+        values['updated_at'] = time()
+
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in values)
+
+        self._connect().execute(
+            f'INSERT INTO accounts (session_name, {columns}) VALUES (?, {placeholders}) '
+            f'ON CONFLICT(session_name) DO UPDATE SET {updates}',
+            (session_name, *values.values()),
+        )
+
+    def delete(self, session_name: str) -> None:
+        self._connect().execute('DELETE FROM accounts WHERE session_name = ?', (session_name,))
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+state_store = StateStore(path=settings.STATE_PATH)
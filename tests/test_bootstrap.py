@@ -0,0 +1,84 @@
+import asyncio
+import os
+import stat
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from bot.core import bootstrap
+from bot.core.bootstrap import bootstrap_web_data
+from bot.utils.cache import SharedCache
+from bot.utils.state import StateStore
+
+
+class StubFetch:
+    # Заглушка get_tg_web_data: считает вызовы и одновременные запросы
+    def __init__(self, failing: set[str] = frozenset()) -> None:
+        self.failing = failing
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, tg_client, proxy, session_name) -> str:
+        self.calls.append(session_name)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+
+        try:
+            await asyncio.sleep(0.01)
+            if session_name in self.failing:
+                raise ConnectionError('telegram is down')
+
+            return f'query_id=1&hash={session_name}'
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(bootstrap, 'state_store', StateStore(path=str(tmp_path / 'state.sqlite3')))
+
+    return SharedCache(path=str(tmp_path / 'tg_web_data.json'), private=True)
+
+
+def _clients(count: int) -> list:
+    return [SimpleNamespace(name=f'session_{index}') for index in range(count)]
+
+
+def test_cached_sessions_skip_telegram(cache):
+    cache.set(key='session_0', value='cached', ttl=3600)
+    fetch = StubFetch()
+
+    progress = asyncio.run(bootstrap_web_data(tg_clients=_clients(3), fetch=fetch, cache=cache))
+
+    assert 'session_0' not in fetch.calls
+    assert progress.cached == 1
+    assert progress.fetched == 2
+
+
+def test_concurrency_cap_is_respected(cache):
+    fetch = StubFetch()
+
+    progress = asyncio.run(bootstrap_web_data(tg_clients=_clients(30), concurrency=4, fetch=fetch, cache=cache))
+
+    assert progress.fetched == 30
+    assert fetch.max_active == 4
+
+
+def test_failing_client_does_not_abort_the_batch(cache):
+    fetch = StubFetch(failing={'session_2'})
+
+    progress = asyncio.run(bootstrap_web_data(tg_clients=_clients(5), fetch=fetch, cache=cache))
+
+    assert progress.failed == 1
+    assert progress.fetched == 4
+    assert cache.get('session_2') is None
+    assert cache.get('session_4') is not None
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='POSIX permissions')
+def test_web_data_file_is_private(cache):
+    asyncio.run(bootstrap_web_data(tg_clients=_clients(1), fetch=StubFetch(), cache=cache))
+
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
@@ -0,0 +1,44 @@
+import multiprocessing
+
+from bot.core import supervisor
+
+
+def _worker_rates(index: int, results) -> None:
+    # Выполняется в дочернем процессе: настройки и лимитер там импортированы заново
+    from bot.core.supervisor import _configure_worker
+    from bot.utils.rate_limit import rate_limiter
+
+    _configure_worker(index=index)
+
+    results.put((rate_limiter.global_bucket.max_rate, rate_limiter._proxy_bucket(proxy='http://proxy:8080').max_rate))
+
+
+def test_worker_rate_limiter_uses_its_share_of_the_budget(monkeypatch):
+    monkeypatch.setenv('WORKERS', '4')
+    monkeypatch.setenv('SHARD_BY', 'session')
+    monkeypatch.setenv('RATE_LIMIT_GLOBAL', '100')
+    monkeypatch.setenv('RATE_LIMIT_PER_PROXY', '20')
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_worker_rates, args=(0, results))
+    process.start()
+
+    try:
+        global_rate, proxy_rate = results.get(timeout=60)
+    finally:
+        process.join(timeout=10)
+
+    assert global_rate == 25
+    assert proxy_rate == 5
+
+
+def test_pick_worker_is_stable_and_shards_by_proxy(monkeypatch):
+    monkeypatch.setattr(supervisor.settings, 'SHARD_BY', 'proxy')
+
+    workers = [0, 1, 2, 3]
+    first = supervisor.pick_worker(session_name='a', proxy='http://proxy:8080', workers=workers)
+    second = supervisor.pick_worker(session_name='b', proxy='http://proxy:8080', workers=workers)
+
+    assert first == second
+    assert first == supervisor.pick_worker(session_name='a', proxy='http://proxy:8080', workers=workers)
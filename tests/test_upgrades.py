@@ -0,0 +1,42 @@
+from random import Random
+
+from bot.core.upgrades import UpgradeIndex
+
+
+def _upgrade(upgrade_id: str, price: int, profit: int) -> dict:
+    return {
+        'id': upgrade_id,
+        'level': 1,
+        'price': price,
+        'profitPerHourDelta': profit,
+        'isAvailable': True,
+        'isExpired': False,
+    }
+
+
+def test_select_batch_fits_a_budget_below_the_resolution():
+    index = UpgradeIndex([_upgrade('a', price=100, profit=50), _upgrade('b', price=60, profit=40)])
+
+    batch = index.select_batch(budget=150, max_price=150, count=2)
+
+    assert sum(upgrade.price for upgrade in batch) <= 150
+    assert [upgrade.id for upgrade in batch] == ['a']
+
+
+def test_select_batch_never_exceeds_the_budget():
+    random = Random(7)
+
+    for _ in range(200):
+        index = UpgradeIndex([
+            _upgrade(f'card{number}', price=random.randint(1, 5000), profit=random.randint(1, 500))
+            for number in range(40)
+        ])
+        budget = random.randint(1, 20000)
+        max_price = random.randint(1, budget)
+        count = random.randint(1, 10)
+
+        batch = index.select_batch(budget=budget, max_price=max_price, count=count)
+
+        assert len(batch) <= count
+        assert sum(upgrade.price for upgrade in batch) <= budget
+        assert all(upgrade.price <= max_price for upgrade in batch)